@@ -0,0 +1,151 @@
+import argparse
+import json
+from collections import Counter
+from pathlib import Path
+from typing import List, Dict, Any
+
+try:
+    from config import QUERY_LOG_FILE
+except ImportError:
+    BASE_DIR = Path(__file__).resolve().parent.parent
+    QUERY_LOG_FILE = BASE_DIR / "logs" / "query_log.jsonl"
+
+# Límites (ms) de los cubos del histograma de latencias
+HIST_BUCKETS_MS = [10, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000]
+
+
+def load_log(path: Path, include_rotated: bool = True) -> List[Dict[str, Any]]:
+    """
+    Carga el log actual y, si se pide, los ficheros rotados (.1, .2, ...),
+    del más antiguo al más reciente.
+    """
+    files = [path]
+    if include_rotated:
+        rotated = [p for p in path.parent.glob(path.name + ".*") if p.suffix[1:].isdigit()]
+        files = sorted(rotated, key=lambda p: int(p.suffix[1:]), reverse=True) + files
+
+    records = []
+    for fp in files:
+        if not fp.exists():
+            continue
+        with open(fp, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+    return records
+
+
+def percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    idx = min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))
+    return values[idx]
+
+
+def print_histogram(name: str, values: List[float]) -> None:
+    print(f"\n[{name}] n={len(values)}  p50={percentile(values, 50):.0f}ms  "
+          f"p90={percentile(values, 90):.0f}ms  p99={percentile(values, 99):.0f}ms")
+    counts = Counter()
+    for v in values:
+        for b in HIST_BUCKETS_MS:
+            if v <= b:
+                counts[b] += 1
+                break
+        else:
+            counts[None] += 1
+    top = max(counts.values(), default=0)
+    labels = [(b, f"<= {b} ms") for b in HIST_BUCKETS_MS] + [(None, f"> {HIST_BUCKETS_MS[-1]} ms")]
+    for b, label in labels:
+        n = counts.get(b, 0)
+        if n == 0:
+            continue
+        bar = "#" * max(1, round(40 * n / top))
+        print(f"  {label:>12} | {bar} {n}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resumen del log de consultas del RAG.")
+    parser.add_argument("--log", type=Path, default=QUERY_LOG_FILE)
+    parser.add_argument("--top", type=int, default=10, help="filas en los rankings")
+    parser.add_argument("--source", help="filtrar por origen (streamlit, rag_chat, ...)")
+    parser.add_argument("--no-rotated", action="store_true", help="ignorar ficheros rotados")
+    args = parser.parse_args()
+
+    records = load_log(args.log, include_rotated=not args.no_rotated)
+    if args.source:
+        records = [r for r in records if r.get("source") == args.source]
+    if not records:
+        print(f"[WARN] No hay registros en {args.log}")
+        return
+
+    n = len(records)
+    errors = sum(1 for r in records if r.get("error"))
+    precomputed = sum(1 for r in records if r.get("precomputed"))
+    zero = sum(1 for r in records if not r.get("n_results") and not r.get("error"))
+    # Solo los tokens que informa Ollama; las estimaciones (stub) se cuentan aparte
+    real_tokens = [r for r in records if r.get("prompt_tokens") and not r.get("tokens_estimated")]
+    prompt_tokens = [r["prompt_tokens"] for r in real_tokens]
+    completion_tokens = [r["completion_tokens"] for r in real_tokens if r.get("completion_tokens")]
+    estimated = sum(1 for r in records if r.get("tokens_estimated"))
+
+    print(f"[RESUMEN] {n} consultas ({records[0].get('ts')} → {records[-1].get('ts')})")
+    print(f"  Origen: {dict(Counter(r.get('source', '?') for r in records))}")
+    print(f"  Respuestas precalculadas: {precomputed} ({100 * precomputed / n:.1f}%)")
+    modes = Counter(r.get("answer_mode") for r in records if r.get("answer_mode"))
+    if modes:
+        print(f"  Modo de respuesta: {dict(modes)}")
+    print(f"  Sin resultados: {zero} ({100 * zero / n:.1f}%)")
+    print(f"  Errores: {errors} ({100 * errors / n:.1f}%)")
+    extractive_errors = sum(1 for r in records if r.get("extractive_error"))
+    if extractive_errors:
+        print(f"  Lector extractivo no disponible (respondió el LLM): {extractive_errors}")
+    if prompt_tokens:
+        print(f"  Tokens de prompt: media={sum(prompt_tokens) / len(prompt_tokens):.0f}  máx={max(prompt_tokens)}")
+    if completion_tokens:
+        print(f"  Tokens de respuesta: media={sum(completion_tokens) / len(completion_tokens):.0f}  "
+              f"máx={max(completion_tokens)}")
+    if estimated:
+        print(f"  Consultas con tokens estimados (backend sin recuento): {estimated}")
+    llm_states = [r["llm"] for r in records if r.get("llm")]
+    if llm_states:
+        busy = sum(1 for r in records if (r.get("error") or "").startswith("SchedulerBusyError"))
+        down = Counter(ep for st in llm_states for ep in st.get("down", []))
+        print(f"  Cola del LLM: máx={max(st['queue_depth'] for st in llm_states)}  "
+              f"rechazadas por ocupación={busy}  instancias caídas vistas={dict(down)}")
+
+    # Histogramas por etapa
+    stages = sorted({s for r in records for s in (r.get("timings_ms") or {})})
+    for stage in stages:
+        values = [r["timings_ms"][stage] for r in records if stage in (r.get("timings_ms") or {})]
+        print_histogram(stage, values)
+
+    # Consultas más lentas
+    print(f"\n[CONSULTAS MÁS LENTAS] top {args.top}")
+    slow = sorted(records, key=lambda r: (r.get("timings_ms") or {}).get("total", 0), reverse=True)
+    for r in slow[:args.top]:
+        t = r.get("timings_ms") or {}
+        print(f"  {t.get('total', 0):>9.0f} ms  {r.get('question', '')[:80]}")
+
+    # Preguntas más frecuentes (candidatas a precalcular)
+    print(f"\n[PREGUNTAS MÁS FRECUENTES] top {args.top}")
+    for q, c in Counter(r.get("question", "") for r in records).most_common(args.top):
+        print(f"  {c:>6}  {q[:80]}")
+
+    # Chunks más recuperados
+    print(f"\n[CHUNKS MÁS RECUPERADOS] top {args.top}")
+    chunk_counts = Counter()
+    for r in records:
+        for ch in r.get("chunks") or []:
+            chunk_counts[(ch.get("pos"), ch.get("id"))] += 1
+    for (pos, cid), c in chunk_counts.most_common(args.top):
+        print(f"  {c:>6}  pos={pos}  id={cid}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Dict, Any
+
+try:
+    import resource   # solo Linux/macOS
+except ImportError:
+    resource = None
+
+SRC_DIR = Path(__file__).resolve().parent
+APP_PATH = SRC_DIR.parent / "streamlit" / "app.py"
+
+TARGETS = ["rag_chat", "query_rag", "streamlit"]
+QUESTIONS = [
+    "¿Cuándo comenzó la invasión de Polonia?",
+    "¿Quién dirigía el Ejército Rojo en Stalingrado?",
+]
+
+# Vocabulario para los documentos sintéticos
+_VOCAB = (
+    "war army battle front division operation invasion offensive troops navy air force "
+    "germany britain france poland soviet union japan italy united states allies axis "
+    "tank aircraft bomber fleet general marshal commander city river bridge supply "
+    "1939 1940 1941 1942 1943 1944 1945 casualties prisoners surrender treaty conference "
+    "the of and in to a was were by with on for from at as which after during"
+).split()
+
+
+# ==========================
+# MEDIDAS DENTRO DEL PROCESO HIJO
+# ==========================
+
+def rss_mb() -> float | None:
+    """RSS actual del proceso (MB). None si la plataforma no lo permite (Windows)."""
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return peak_mb()
+
+
+def peak_mb() -> float | None:
+    """RSS máximo alcanzado por el proceso (MB). None si no hay módulo `resource`."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class PhaseRecorder:
+    def __init__(self):
+        self.phases: List[Dict[str, Any]] = []
+        self._t = time.perf_counter()
+
+    def mark(self, name: str, **extra) -> None:
+        now = time.perf_counter()
+        self.phases.append({
+            "phase": name,
+            "seconds": now - self._t,
+            "rss_mb": rss_mb(),
+            "peak_mb": peak_mb(),
+            **extra,
+        })
+        self._t = time.perf_counter()
+
+
+def probe_rag_chat(rec: PhaseRecorder) -> None:
+    import numpy, faiss, torch, sentence_transformers  # noqa: F401
+    rec.mark("import_deps")
+
+    import rag_chat
+    rec.mark("import_rag_chat", breakdown=rag_chat.STARTUP_TIMINGS)
+
+    rag_chat.answer_with_rag(QUESTIONS[0], use_precomputed=False, source="bench")
+    rec.mark("first_answer")
+    rag_chat.answer_with_rag(QUESTIONS[1], use_precomputed=False, source="bench")
+    rec.mark("warm_answer")
+
+
+def probe_query_rag(rec: PhaseRecorder) -> None:
+    import numpy, faiss, torch, sentence_transformers  # noqa: F401
+    rec.mark("import_deps")
+
+    import query_rag
+    model = sentence_transformers.SentenceTransformer(query_rag.EMBEDDING_MODEL_NAME)
+    rec.mark("load_embedder")
+    index, metadata = query_rag.load_index_and_metadata()
+    rec.mark("load_index_and_metadata")
+
+    query_rag.search(index, metadata, model, QUESTIONS[0])
+    rec.mark("first_search")
+    query_rag.search(index, metadata, model, QUESTIONS[1])
+    rec.mark("warm_search")
+
+
+def probe_streamlit(rec: PhaseRecorder) -> None:
+    import numpy, faiss, torch, sentence_transformers  # noqa: F401
+    from streamlit.testing.v1 import AppTest
+    rec.mark("import_deps")
+
+    # El primer render importa rag_chat (índice, metadatos, embeddings)
+    at = AppTest.from_file(str(APP_PATH), default_timeout=600)
+    at.run()
+    rec.mark("first_render")
+
+    at.chat_input[0].set_value(QUESTIONS[0]).run()
+    rec.mark("first_answer")
+    at.chat_input[0].set_value(QUESTIONS[1]).run()
+    rec.mark("warm_answer")
+
+
+PROBES = {
+    "rag_chat": probe_rag_chat,
+    "query_rag": probe_query_rag,
+    "streamlit": probe_streamlit,
+}
+
+
+def run_probe(target: str) -> None:
+    """Punto de entrada del proceso hijo: mide un objetivo e imprime el resultado en JSON."""
+    rec = PhaseRecorder()
+    PROBES[target](rec)
+    print("BENCH_RESULT " + json.dumps(rec.phases))
+
+
+# ==========================
+# CORPUS SINTÉTICO
+# ==========================
+
+def write_synthetic_corpus(path: Path, n_chunks: int, chunk_chars: int = 800, seed: int = 0) -> None:
+    """documentos.jsonl con `n_chunks` chunks de texto aleatorio (10 chunks por documento)."""
+    rng = random.Random(seed)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(n_chunks):
+            words = []
+            while sum(len(w) + 1 for w in words) < chunk_chars:
+                words.append(rng.choice(_VOCAB))
+            texto = " ".join(words)[:chunk_chars]
+            doc_id = f"synthetic_{i // 10}"
+            start = (i % 10) * chunk_chars
+            f.write(json.dumps({
+                "id": f"{doc_id}_chunk{i % 10}",
+                "texto": texto,
+                "fuente": "sintetico",
+                "metadata": {"title": f"Documento sintético {i // 10}"},
+                "doc_id": doc_id,
+                "chunk_index": i % 10,
+                "char_start": start,
+                "char_end": start + len(texto),
+            }, ensure_ascii=False) + "\n")
+
+
+# ==========================
+# CACHÉ DE PÁGINAS DEL SO
+# ==========================
+
+def cached_paths(workdir: Path) -> List[Path]:
+    """Ficheros que leen los objetivos al arrancar: corpus e índice, modelos y librerías."""
+    hf_home = Path(os.environ.get("HF_HOME", Path.home() / ".cache" / "huggingface"))
+    return [workdir, hf_home, Path(sys.prefix)]
+
+
+def drop_page_cache(paths: List[Path]) -> bool:
+    """
+    Intenta vaciar la caché de páginas para que la siguiente medición sea en frío:
+    /proc/sys/vm/drop_caches (Linux, root) o `vmtouch -e` sobre `paths`.
+    Devuelve False si no se ha podido (la medición será solo la primera ejecución).
+    """
+    if sys.platform.startswith("linux"):
+        try:
+            os.sync()
+            with open("/proc/sys/vm/drop_caches", "w") as f:
+                f.write("3\n")
+            return True
+        except OSError:
+            pass
+    if shutil.which("vmtouch"):
+        existing = [str(p) for p in paths if p.exists()]
+        proc = subprocess.run(["vmtouch", "-q", "-e", *existing], capture_output=True)
+        return proc.returncode == 0
+    return False
+
+
+# ==========================
+# ORQUESTACIÓN
+# ==========================
+
+def child_env(workdir: Path) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update({
+        "RAG_DATA_PROCESSED": str(workdir / "processed"),
+        "RAG_INDEX_DIR": str(workdir / "index"),
+        "RAG_LOGS_DIR": str(workdir / "logs"),
+        "RAG_LLM_BACKEND": "stub",
+        # Sin umbral: que las preguntas recorran el camino completo hasta el LLM
+        "RAG_RELEVANCE_THRESHOLD": "-1",
+    })
+    return env
+
+
+def measure(target: str, env: Dict[str, str]) -> List[Dict[str, Any]]:
+    proc = subprocess.run(
+        [sys.executable, __file__, "--probe", target],
+        cwd=SRC_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    for line in proc.stdout.splitlines():
+        if line.startswith("BENCH_RESULT "):
+            return json.loads(line[len("BENCH_RESULT "):])
+    raise RuntimeError(f"La medición de {target} falló:\n{proc.stderr[-2000:]}")
+
+
+def summarize(first: List[Dict[str, Any]], repeat_runs: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    rows = []
+    for i, phase in enumerate(first):
+        repeat = [run[i]["seconds"] for run in repeat_runs if i < len(run)]
+        rows.append({
+            "phase": phase["phase"],
+            "first_s": phase["seconds"],
+            "repeat_s": statistics.median(repeat) if repeat else None,
+            "rss_mb": phase["rss_mb"],
+            "peak_mb": phase["peak_mb"],
+            "breakdown": phase.get("breakdown"),
+        })
+    return rows
+
+
+def _fmt(value: float | None, width: int, digits: int) -> str:
+    return f"{value:>{width}.{digits}f}" if value is not None else f"{'-':>{width}}"
+
+
+def print_table(size: int, target: str, rows: List[Dict[str, Any]], cold: bool) -> None:
+    # Sin vaciar la caché de páginas, la primera ejecución no es un arranque en frío
+    first_label = "frío (s)" if cold else "1ª ejec. (s)"
+    print(f"\n[{target}] corpus={size} chunks")
+    print(f"  {'fase':<26} {first_label:>12} {'mediana repet. (s)':>19} {'RSS (MB)':>9} {'pico (MB)':>10}")
+    for r in rows:
+        print(f"  {r['phase']:<26} {r['first_s']:>12.3f} {_fmt(r['repeat_s'], 19, 3)} "
+              f"{_fmt(r['rss_mb'], 9, 0)} {_fmt(r['peak_mb'], 10, 0)}")
+        for sub, secs in (r.get("breakdown") or {}).items():
+            print(f"    · {sub:<22} {secs:>12.3f}")
+    total_first = sum(r["first_s"] for r in rows)
+    repeat_values = [r["repeat_s"] for r in rows if r["repeat_s"] is not None]
+    total_repeat = sum(repeat_values) if repeat_values else None
+    print(f"  {'total':<26} {total_first:>12.3f} {_fmt(total_repeat, 19, 3)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Tiempo de arranque, primera respuesta (LLM stub) y memoria de los puntos de entrada."
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000], help="chunks del corpus sintético")
+    parser.add_argument("--targets", nargs="+", choices=TARGETS, default=TARGETS)
+    parser.add_argument("--repeat", type=int, default=3, help="ejecuciones repetidas por objetivo")
+    parser.add_argument("--json", type=Path, help="guardar los resultados en este fichero")
+    parser.add_argument("--keep", action="store_true", help="no borrar los corpus e índices generados")
+    parser.add_argument("--probe", choices=TARGETS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.probe:
+        run_probe(args.probe)
+        return
+
+    results = []
+    for size in args.sizes:
+        workdir = Path(tempfile.mkdtemp(prefix=f"rag_bench_{size}_"))
+        env = child_env(workdir)
+        try:
+            print(f"[INFO] Generando corpus sintético de {size} chunks en {workdir}")
+            write_synthetic_corpus(workdir / "processed" / "documentos.jsonl", size)
+
+            print("[INFO] Construyendo índice...")
+            t0 = time.perf_counter()
+            proc = subprocess.run([sys.executable, "build_index.py"], cwd=SRC_DIR, env=env,
+                                  capture_output=True, text=True)
+            if proc.returncode != 0:
+                raise RuntimeError(f"build_index.py falló:\n{proc.stderr[-2000:]}")
+            print(f"[INFO] Índice construido en {time.perf_counter() - t0:.1f}s")
+
+            for target in args.targets:
+                # Cada medición es un intérprete nuevo. build_index.py ya ha cargado
+                # librerías y modelo, así que la primera ejecución solo es en frío
+                # si se consigue vaciar la caché de páginas del SO antes.
+                cold = drop_page_cache(cached_paths(workdir))
+                if not cold:
+                    print("[WARN] No se pudo vaciar la caché de páginas (hace falta root o vmtouch): "
+                          "la primera ejecución no es un arranque en frío")
+                first = measure(target, env)
+                repeat_runs = [measure(target, env) for _ in range(args.repeat)]
+                rows = summarize(first, repeat_runs)
+                print_table(size, target, rows, cold)
+                results.append({"size": size, "target": target, "page_cache_dropped": cold, "phases": rows})
+        finally:
+            if args.keep:
+                print(f"[INFO] Corpus e índice conservados en {workdir}")
+            else:
+                shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n[DONE] Resultados guardados en {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,12 +2,15 @@ import json
 from pathlib import Path
 
 try:
-    from config import DATA_PROCESSED, CHUNK_SIZE, CHUNK_OVERLAP
+    from config import DATA_PROCESSED, CHUNK_SIZE, CHUNK_OVERLAP, DEDUP_NEAR_THRESHOLD
 except ImportError:
     BASE_DIR = Path(__file__).resolve().parent.parent
     DATA_PROCESSED = BASE_DIR / "data" / "processed"
     CHUNK_SIZE = 800
     CHUNK_OVERLAP = 200
+    DEDUP_NEAR_THRESHOLD = 0.85
+
+from dedup import dedup_documents, dedup_near_chunks
 
 
 def load_jsonl(path: Path):
@@ -34,24 +37,27 @@ def load_jsonl(path: Path):
     return docs
 
 
-def chunk_text(text: str, size: int, overlap: int):
-    """Divide un texto largo en chunks solapados."""
-    text = text or ""
-    length = len(text)
-    if length == 0:
-        return []
-
-    chunks = []
+def chunk_spans(text: str, size: int, overlap: int):
+    """Posiciones (inicio, fin) de los chunks solapados de un texto."""
+    length = len(text or "")
+    spans = []
     start = 0
 
     while start < length:
         end = min(start + size, length)
-        chunk = text[start:end]
-        chunks.append(chunk)
+        spans.append((start, end))
+        if end == length:
+            break
         start = end - overlap
         if start < 0:
             start = 0
-    return chunks
+    return spans
+
+
+def chunk_text(text: str, size: int, overlap: int):
+    """Divide un texto largo en chunks solapados."""
+    text = text or ""
+    return [text[start:end] for start, end in chunk_spans(text, size, overlap)]
 
 
 def main():
@@ -72,34 +78,54 @@ def main():
         print("-> Revisa que ingest_wikipedia.py y ingest_geo_pdf.py hayan generado contenido.")
         return
 
-    final_path = DATA_PROCESSED / "documentos.jsonl"
-
-    with open(final_path, "w", encoding="utf-8") as f_out:
-        total_chunks = 0
+    # 2) Duplicados exactos: mismo pageid o mismo contenido
+    all_docs, doc_stats = dedup_documents(all_docs)
+    print(f"[INFO] Documentos duplicados eliminados: por pageid={doc_stats['by_pageid']}, "
+          f"por contenido={doc_stats['by_content']}")
 
-        for idx, doc in enumerate(all_docs, start=1):
-            texto = doc.get("texto", "")
-            if not texto:
-                print(f"[WARN] Doc {idx} sin campo 'texto' o vacío, id={doc.get('id')}")
-                continue
+    # 3) Chunking
+    chunks = []
+    for idx, doc in enumerate(all_docs, start=1):
+        texto = doc.get("texto", "")
+        if not texto:
+            print(f"[WARN] Doc {idx} sin campo 'texto' o vacío, id={doc.get('id')}")
+            continue
+
+        spans = chunk_spans(texto, CHUNK_SIZE, CHUNK_OVERLAP)
+        if idx == 1:
+            # debug solo para el primer doc
+            print(f"[DEBUG] Doc {idx} (id={doc.get('id')}), longitud texto={len(texto)}, chunks generados={len(spans)}")
+
+        doc_id = doc.get("id", "doc")
+        for i, (start, end) in enumerate(spans):
+            chunks.append({
+                "id": f"{doc_id}_chunk{i}",
+                "texto": texto[start:end],
+                "fuente": doc.get("fuente", "desconocida"),
+                "metadata": doc.get("metadata", {}),
+                # Posición dentro del documento original, para reconstruir vecinos
+                "doc_id": doc_id,
+                "chunk_index": i,
+                "char_start": start,
+                "char_end": end,
+            })
+
+    # 4) Casi duplicados entre chunks (MinHash + LSH)
+    total_chunks = len(chunks)
+    chunks, dropped = dedup_near_chunks(chunks, threshold=DEDUP_NEAR_THRESHOLD)
+    pct = 100 * len(dropped) / total_chunks if total_chunks else 0.0
+    print(f"[INFO] Chunks casi duplicados eliminados (Jaccard >= {DEDUP_NEAR_THRESHOLD}): "
+          f"{len(dropped)} de {total_chunks} ({pct:.1f}%)")
+    for dropped_id, kept_id, sim in dropped[:10]:
+        print(f"[DEBUG]   {dropped_id} ~ {kept_id} (jaccard={sim})")
 
-            chunks = chunk_text(texto, CHUNK_SIZE, CHUNK_OVERLAP)
-            if idx == 1:
-                # debug solo para el primer doc
-                print(f"[DEBUG] Doc {idx} (id={doc.get('id')}), longitud texto={len(texto)}, chunks generados={len(chunks)}")
-
-            for i, ch in enumerate(chunks):
-                new_doc = {
-                    "id": f"{doc.get('id', 'doc')}_chunk{i}",
-                    "texto": ch,
-                    "fuente": doc.get("fuente", "desconocida"),
-                    "metadata": doc.get("metadata", {})
-                }
-                f_out.write(json.dumps(new_doc, ensure_ascii=False) + "\n")
-                total_chunks += 1
+    final_path = DATA_PROCESSED / "documentos.jsonl"
+    with open(final_path, "w", encoding="utf-8") as f_out:
+        for new_doc in chunks:
+            f_out.write(json.dumps(new_doc, ensure_ascii=False) + "\n")
 
     print(f"[DONE] Dataset final guardado en: {final_path}")
-    print(f"[DONE] Total de chunks generados: {total_chunks}")
+    print(f"[DONE] Total de chunks generados: {len(chunks)}")
 
 
 if __name__ == "__main__":
@@ -1,34 +1,48 @@
 import json
-import numpy as np
 import faiss
 from pathlib import Path
 from sentence_transformers import SentenceTransformer
 
+from index_manifest import write_manifest
+from similarity import normalize
+
 # Intentamos usar config.py si existe
 try:
-    from config import DATA_PROCESSED, INDEX_DIR
+    from config import (
+        DATA_PROCESSED, INDEX_DIR, EMBEDDING_MODEL_NAME,
+        SMALL_TO_BIG, SMALL_CHUNK_SIZE, SMALL_CHUNK_OVERLAP,
+    )
 except ImportError:
     BASE_DIR = Path(__file__).resolve().parent.parent
     DATA_PROCESSED = BASE_DIR / "data" / "processed"
     INDEX_DIR = BASE_DIR / "index"
+    EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+    SMALL_TO_BIG = False
+    SMALL_CHUNK_SIZE = 300
+    SMALL_CHUNK_OVERLAP = 50
 
 DOCUMENTS_FILE = DATA_PROCESSED / "documentos.jsonl"
 
 
-def split_text(text: str, max_chars: int = 1200, overlap: int = 200):
+def split_spans(n: int, max_chars: int = 1200, overlap: int = 200):
     """
-    Divide un texto largo en chunks de tamaño max_chars,
-    solapados 'overlap' caracteres para no cortar ideas a la mitad.
+    Posiciones (inicio, fin) de los chunks de un texto de longitud n,
+    de tamaño max_chars y solapados 'overlap' caracteres.
     """
-    chunks = []
+    spans = []
     start = 0
-    n = len(text)
     while start < n:
-        end = start + max_chars
-        chunk = text[start:end]
-        chunks.append(chunk)
+        spans.append((start, min(start + max_chars, n)))
         start += max_chars - overlap
-    return chunks
+    return spans
+
+
+def split_text(text: str, max_chars: int = 1200, overlap: int = 200):
+    """
+    Divide un texto largo en chunks de tamaño max_chars,
+    solapados 'overlap' caracteres para no cortar ideas a la mitad.
+    """
+    return [text[start:end] for start, end in split_spans(len(text), max_chars, overlap)]
 
 
 def main():
@@ -37,6 +51,7 @@ def main():
     # 1. Cargar documentos (chunks)
     textos = []
     metadatos = []
+    padres = []   # solo en modo small-to-big: chunks grandes a los que se expande cada acierto
 
     if not DOCUMENTS_FILE.exists():
         raise FileNotFoundError(f"No se encuentra {DOCUMENTS_FILE}")
@@ -49,31 +64,60 @@ def main():
             if not texto_original:
                 continue
 
-            # Trocear el texto original en chunks más pequeños
-            chunks = split_text(texto_original, max_chars=1200, overlap=200)
+            # Offsets relativos al documento original (build_dataset guarda char_start)
+            doc_id = d.get("doc_id", d.get("id"))
+            base = d.get("char_start", 0)
 
-            for i, chunk in enumerate(chunks):
+            # Trocear el texto original en chunks más pequeños
+            for i, (start, end) in enumerate(split_spans(len(texto_original), max_chars=1200, overlap=200)):
                 nuevo_meta = dict(d)          # copia superficial
-                nuevo_meta["texto"] = chunk   # sustituimos por el trozo
+                nuevo_meta["texto"] = texto_original[start:end]   # sustituimos por el trozo
                 nuevo_meta["chunk_id"] = i    # opcional: índice del chunk
-
-                textos.append(chunk)
-                metadatos.append(nuevo_meta)
-
+                nuevo_meta["doc_id"] = doc_id
+                nuevo_meta["char_start"] = base + start
+                nuevo_meta["char_end"] = base + end
+
+                if not SMALL_TO_BIG:
+                    textos.append(nuevo_meta["texto"])
+                    metadatos.append(nuevo_meta)
+                    continue
+
+                # Small-to-big: el chunk es el padre; se indexan ventanas pequeñas dentro de él
+                parent_pos = len(padres)
+                padres.append(nuevo_meta)
+                parent_text = nuevo_meta["texto"]
+                for j, (s0, s1) in enumerate(split_spans(len(parent_text), SMALL_CHUNK_SIZE, SMALL_CHUNK_OVERLAP)):
+                    ventana = {
+                        "id": nuevo_meta.get("id"),
+                        "texto": parent_text[s0:s1],
+                        "fuente": nuevo_meta.get("fuente"),
+                        "doc_id": doc_id,
+                        "chunk_id": i,
+                        "window_id": j,
+                        "char_start": base + start + s0,
+                        "char_end": base + start + s1,
+                        "parent_pos": parent_pos,
+                    }
+                    textos.append(ventana["texto"])
+                    metadatos.append(ventana)
+
+    if SMALL_TO_BIG:
+        print(f"[INFO] Small-to-big: {len(padres)} chunks padre, {len(textos)} ventanas a indexar")
     print(f"[INFO] Total de chunks cargados: {len(textos)}")
 
     # 2. Cargar modelo de embeddings (gratuito, local)
-    print("[INFO] Cargando modelo de embeddings (all-MiniLM-L6-v2)...")
-    model = SentenceTransformer("all-MiniLM-L6-v2")
+    print(f"[INFO] Cargando modelo de embeddings ({EMBEDDING_MODEL_NAME})...")
+    model = SentenceTransformer(EMBEDDING_MODEL_NAME)
 
     # 3. Calcular embeddings
     print("[INFO] Calculando embeddings...")
     embeddings = model.encode(textos, batch_size=32, show_progress_bar=True)
-    embeddings = np.array(embeddings).astype("float32")
+    # Normalizados: el producto interno del índice es la similitud coseno
+    embeddings = normalize(embeddings)
 
-    # 4. Crear índice FAISS
+    # 4. Crear índice FAISS (producto interno sobre vectores unitarios = coseno)
     dim = embeddings.shape[1]
-    index = faiss.IndexFlatL2(dim)
+    index = faiss.IndexFlatIP(dim)
     index.add(embeddings)
     print(f"[INFO] Índice FAISS creado con {index.ntotal} vectores.")
 
@@ -88,6 +132,25 @@ def main():
     print(f"[DONE] Índice guardado en: {index_path}")
     print(f"[DONE] Metadatos guardados en: {meta_path}")
 
+    parents_path = INDEX_DIR / "parents.json"
+    if SMALL_TO_BIG:
+        with open(parents_path, "w", encoding="utf-8") as f:
+            json.dump(padres, f, ensure_ascii=False)
+        print(f"[DONE] Chunks padre guardados en: {parents_path}")
+    elif parents_path.exists():
+        parents_path.unlink()   # de un índice small-to-big anterior
+
+    # 6. Manifest con la huella del índice (invalida respuestas precalculadas antiguas)
+    manifest = write_manifest(
+        index_path,
+        meta_path,
+        embedding_model=EMBEDDING_MODEL_NAME,
+        metric="cosine",
+        retrieval="small_to_big" if SMALL_TO_BIG else "standard",
+        n_vectors=int(index.ntotal),
+    )
+    print(f"[DONE] Manifest guardado (fingerprint={manifest['fingerprint']})")
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,207 @@
+import argparse
+import json
+import math
+from pathlib import Path
+from typing import List, Dict, Any
+
+from analyze_query_log import load_log, percentile
+from precompute_answers import normalize_question
+
+try:
+    from config import QUERY_LOG_FILE
+except ImportError:
+    BASE_DIR = Path(__file__).resolve().parent.parent
+    QUERY_LOG_FILE = BASE_DIR / "logs" / "query_log.jsonl"
+
+# Umbrales candidatos que se muestran en la tabla
+CANDIDATES = [round(0.05 * i, 2) for i in range(0, 13)]
+CONFIDENCE_CANDIDATES = [round(0.1 * i, 1) for i in range(1, 10)]
+
+
+# ==========================
+# PUNTUACIONES
+# ==========================
+
+def load_labelled(path: Path) -> List[Dict[str, Any]]:
+    """
+    Lee preguntas etiquetadas de un .jsonl:
+    {"question": "...", "answerable": true}  (la respuesta está en el corpus)
+    {"question": "...", "answerable": false} (fuera del corpus)
+    """
+    items = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            rec = json.loads(line)
+            items.append({"question": rec["question"], "answerable": bool(rec["answerable"])})
+    return items
+
+
+def score_labelled(items: List[Dict[str, Any]], k: int) -> List[Dict[str, Any]]:
+    """Mejor similitud coseno de cada pregunta, recuperando sin umbral."""
+    # Importamos aquí: rag_chat carga índice y embeddings al importarse
+    from rag_chat import retrieve_context
+
+    for item in items:
+        docs = retrieve_context(item["question"], k=k, min_score=None)
+        item["score"] = docs[0]["score"] if docs else -1.0
+    return items
+
+
+def score_extractive(path: Path, k: int) -> List[Dict[str, Any]]:
+    """
+    Confianza del lector extractivo en preguntas con respuesta conocida
+    ({"question": "...", "answer": "..."} por línea) y si el fragmento es correcto
+    (uno contiene al otro, comparando sin tildes ni puntuación).
+    """
+    from rag_chat import retrieve_context
+    from extractive import get_reader
+
+    items = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            rec = json.loads(line)
+            docs = retrieve_context(rec["question"], k=k, min_score=None)
+            best = get_reader().extract(rec["question"], docs)
+            span = normalize_question(best["answer"]) if best else ""
+            expected = normalize_question(rec["answer"])
+            items.append({
+                "question": rec["question"],
+                "confidence": best["confidence"] if best else 0.0,
+                "correct": bool(span) and (span in expected or expected in span),
+            })
+    return items
+
+
+def logged_top_scores(path: Path) -> List[float]:
+    """
+    Mejor similitud de cada consulta del log. Solo sirve si el log se generó
+    con el umbral desactivado (si no, las consultas rechazadas no aparecen).
+    """
+    scores = []
+    for r in load_log(path):
+        chunk_scores = [ch["score"] for ch in r.get("chunks") or [] if ch.get("score") is not None]
+        if chunk_scores:
+            scores.append(max(chunk_scores))
+    return scores
+
+
+# ==========================
+# ELECCIÓN DEL UMBRAL
+# ==========================
+
+def suggest_threshold(items: List[Dict[str, Any]], target_recall: float) -> float:
+    """
+    Umbral más alto que sigue dejando pasar al menos `target_recall`
+    de las preguntas con respuesta en el corpus.
+    """
+    answerable = sorted((it["score"] for it in items if it["answerable"]), reverse=True)
+    if not answerable:
+        raise ValueError("Hacen falta preguntas con answerable=true para calibrar")
+    keep = min(len(answerable), max(1, math.ceil(len(answerable) * target_recall)))
+    return round(answerable[keep - 1], 4)
+
+
+def print_table(items: List[Dict[str, Any]]) -> None:
+    pos = [it["score"] for it in items if it["answerable"]]
+    neg = [it["score"] for it in items if not it["answerable"]]
+    print(f"\n  {'umbral':>7} {'con respuesta que pasan':>24} {'sin respuesta rechazadas':>25}")
+    for t in CANDIDATES:
+        kept = sum(1 for s in pos if s >= t) / len(pos)
+        rejected = sum(1 for s in neg if s < t) / len(neg) if neg else None
+        rej = f"{rejected:>24.0%}" if rejected is not None else f"{'-':>24}"
+        print(f"  {t:>7.2f} {kept:>23.0%} {rej}")
+
+
+def calibrate_extractive(items: List[Dict[str, Any]], target_precision: float) -> None:
+    """
+    Para cada confianza mínima: qué parte de las preguntas se respondería sin LLM
+    y cuántas de esas respuestas serían correctas. Sugiere la menor confianza
+    que alcanza `target_precision`.
+    """
+    print(f"\n  {'confianza':>9} {'sin LLM':>8} {'correctas':>10}")
+    suggested = None
+    for c in CONFIDENCE_CANDIDATES:
+        answered = [it for it in items if it["confidence"] >= c]
+        precision = sum(it["correct"] for it in answered) / len(answered) if answered else None
+        prec = f"{precision:>10.0%}" if precision is not None else f"{'-':>10}"
+        print(f"  {c:>9.1f} {len(answered) / len(items):>8.0%} {prec}")
+        if suggested is None and precision is not None and precision >= target_precision:
+            suggested = c
+    if suggested is None:
+        print(f"\n[WARN] Ninguna confianza alcanza {target_precision:.0%} de respuestas correctas: "
+              "no conviene usar el modo extractivo con este corpus")
+        return
+    print(f"\n[DONE] Confianza mínima sugerida: {suggested} "
+          f"(>= {target_precision:.0%} de respuestas extractivas correctas)")
+    print(f"[DONE] Úsala con RAG_EXTRACTIVE_MIN_CONFIDENCE={suggested}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Calibra RELEVANCE_THRESHOLD con preguntas etiquetadas o con las similitudes del log, "
+                    "o EXTRACTIVE_MIN_CONFIDENCE con --extractive."
+    )
+    parser.add_argument("labelled", type=Path, nargs="?",
+                        help=".jsonl con {\"question\", \"answerable\"} por línea "
+                             "(con --extractive, {\"question\", \"answer\"})")
+    parser.add_argument("--log", type=Path, help="usar las similitudes del log de consultas (sin etiquetas)")
+    parser.add_argument("--k", type=int, default=5, help="chunks recuperados por pregunta")
+    parser.add_argument("--target-recall", type=float, default=0.95,
+                        help="fracción mínima de preguntas con respuesta que deben pasar el umbral")
+    parser.add_argument("--extractive", action="store_true",
+                        help="calibrar la confianza mínima del modo extractivo")
+    parser.add_argument("--target-precision", type=float, default=0.9,
+                        help="con --extractive, fracción mínima de respuestas extractivas correctas")
+    args = parser.parse_args()
+
+    if args.extractive:
+        if args.labelled is None:
+            parser.error("--extractive necesita un fichero de preguntas con respuesta")
+        items = score_extractive(args.labelled, args.k)
+        if not items:
+            print(f"[WARN] No hay preguntas en {args.labelled}")
+            return
+        print(f"[INFO] {len(items)} preguntas con respuesta conocida")
+        calibrate_extractive(items, args.target_precision)
+        return
+
+    if args.labelled is None and args.log is None:
+        args.log = QUERY_LOG_FILE
+
+    if args.labelled is None:
+        scores = logged_top_scores(args.log)
+        if not scores:
+            print(f"[WARN] No hay similitudes en {args.log}")
+            return
+        print(f"[INFO] Mejor similitud por consulta en {args.log} (n={len(scores)}, sin etiquetas)")
+        for p in (5, 10, 25, 50, 75, 90):
+            print(f"  p{p:<3} {percentile(scores, p):.4f}")
+        print("[INFO] Sin etiquetas no se puede elegir un umbral: un p5-p10 bajo indica el mínimo "
+              "que alcanzan preguntas reales. Para calibrar, etiqueta una muestra y pásala como fichero.")
+        return
+
+    items = load_labelled(args.labelled)
+    n_pos = sum(1 for it in items if it["answerable"])
+    # Se comprueba antes de cargar índice y embeddings para puntuar
+    if n_pos == 0:
+        parser.error(f"{args.labelled} no tiene preguntas con answerable=true: hacen falta para calibrar")
+    items = score_labelled(items, args.k)
+    print(f"[INFO] {len(items)} preguntas etiquetadas ({n_pos} con respuesta, {len(items) - n_pos} sin respuesta)")
+
+    threshold = suggest_threshold(items, args.target_recall)
+    print_table(items)
+    neg = [it["score"] for it in items if not it["answerable"]]
+    rejected = sum(1 for s in neg if s < threshold)
+    print(f"\n[DONE] Umbral sugerido: {threshold} (pasan >= {args.target_recall:.0%} de las preguntas con respuesta; "
+          f"rechaza {rejected}/{len(neg)} sin respuesta)")
+    print(f"[DONE] Úsalo con RAG_RELEVANCE_THRESHOLD={threshold} y vuelve a ejecutar precompute_answers.py")
+
+
+if __name__ == "__main__":
+    main()
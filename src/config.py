@@ -1,11 +1,13 @@
+import os
 from pathlib import Path
 
 # Carpeta raíz del proyecto (ajusta si hiciera falta)
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 DATA_RAW = BASE_DIR / "data" / "raw" 
-DATA_PROCESSED = BASE_DIR / "data" / "processed"
-INDEX_DIR = BASE_DIR / "index"
+# Se pueden redirigir con variables de entorno (p. ej. benchmarks con corpus sintéticos)
+DATA_PROCESSED = Path(os.environ.get("RAG_DATA_PROCESSED", BASE_DIR / "data" / "processed"))
+INDEX_DIR = Path(os.environ.get("RAG_INDEX_DIR", BASE_DIR / "index"))
 
 # Fichero final con todos los documentos chunked
 DOCUMENTS_FILE = DATA_PROCESSED / "documentos.jsonl"
@@ -13,3 +15,66 @@ DOCUMENTS_FILE = DATA_PROCESSED / "documentos.jsonl"
 # Parámetros de chunking
 CHUNK_SIZE = 800      # tamaño del trozo (caracteres aprox)
 CHUNK_OVERLAP = 200   # solapamiento entre trozos
+
+# Modelo de embeddings (índice y consultas deben usar el mismo)
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+# Backend de generación: "ollama" (servidor real) o "stub" (determinista, para tests/benchmarks)
+LLM_BACKEND = os.environ.get("RAG_LLM_BACKEND", "ollama")
+
+# Parámetros de Ollama
+OLLAMA_URL = os.environ.get("RAG_OLLAMA_URL", "http://localhost:11434/api/chat")
+LLAMA_MODEL = "llama3.1:8b"
+OLLAMA_KEEP_ALIVE = "30m"         # cuánto tiempo mantiene Ollama el modelo cargado en memoria
+OLLAMA_CONNECT_TIMEOUT = 5        # segundos para abrir la conexión
+OLLAMA_FIRST_TOKEN_TIMEOUT = 60   # segundos máximos hasta el primer token (y entre tokens)
+OLLAMA_READ_TIMEOUT = 120         # segundos máximos para la respuesta completa
+OLLAMA_MAX_RETRIES = 2            # reintentos ante fallos de conexión o 502/503/504
+OLLAMA_POOL_SIZE = 4              # conexiones keep-alive reutilizables
+
+# Pool de instancias de Ollama (separadas por comas). Por defecto, solo OLLAMA_URL
+OLLAMA_ENDPOINTS = [
+    u.strip() for u in os.environ.get("RAG_OLLAMA_ENDPOINTS", OLLAMA_URL).split(",") if u.strip()
+]
+SCHEDULER_MAX_INFLIGHT_PER_ENDPOINT = 2   # generaciones simultáneas por instancia
+SCHEDULER_MAX_QUEUE = 16                  # peticiones esperando como máximo
+SCHEDULER_QUEUE_TIMEOUT = 30              # segundos máximos esperando turno
+SCHEDULER_FAILURES_BEFORE_DOWN = 3        # fallos seguidos para marcar una instancia como caída
+SCHEDULER_RETRY_DOWN_AFTER = 15           # segundos antes de volver a probar una instancia caída
+
+# Log de consultas (JSONL con rotación)
+LOGS_DIR = Path(os.environ.get("RAG_LOGS_DIR", BASE_DIR / "logs"))
+QUERY_LOG_FILE = LOGS_DIR / "query_log.jsonl"
+QUERY_LOG_MAX_BYTES = 10 * 1024 * 1024   # rota al llegar a 10 MB
+QUERY_LOG_BACKUPS = 5                    # ficheros rotados que se conservan
+
+# Relevancia mínima (similitud coseno) para usar un chunk como contexto.
+# Si ningún chunk la supera, se responde "no aparece" sin llamar al LLM.
+# Desactivado (None) hasta calibrarlo: con preguntas en español sobre textos en inglés
+# y un modelo de embeddings solo inglés, chunks correctos pueden dar similitudes bajas.
+# Calibrar con `python calibrate_threshold.py preguntas_etiquetadas.jsonl` y fijarlo
+# con RAG_RELEVANCE_THRESHOLD.
+_relevance_threshold = os.environ.get("RAG_RELEVANCE_THRESHOLD", "").strip()
+RELEVANCE_THRESHOLD = float(_relevance_threshold) if _relevance_threshold else None
+
+# Deduplicación antes de embeddings
+DEDUP_NEAR_THRESHOLD = 0.85   # Jaccard mínimo entre chunks para considerarlos casi duplicados
+MINHASH_NUM_PERM = 128        # tamaño de la firma MinHash
+MINHASH_BANDS = 16            # bandas LSH (MINHASH_NUM_PERM debe ser múltiplo)
+SHINGLE_SIZE = 3              # palabras por shingle
+
+# Small-to-big: se indexan ventanas pequeñas (más precisas y baratas de embeber)
+# y cada acierto se expande a su chunk padre antes de construir el prompt.
+SMALL_TO_BIG = False
+SMALL_CHUNK_SIZE = 300        # caracteres de cada ventana indexada
+SMALL_CHUNK_OVERLAP = 50
+SMALL_TO_BIG_FANOUT = 4       # ventanas recuperadas por cada chunk padre pedido (k)
+
+# Modo extractivo: un modelo de QA extractivo busca la respuesta literal en los chunks
+# y solo se llama al LLM si la confianza no llega al umbral.
+EXTRACTIVE_MODEL = "deepset/xlm-roberta-base-squad2"   # multilingüe: preguntas en español, textos en inglés
+# Sin calibrar: medir con `python calibrate_threshold.py --extractive preguntas.jsonl`
+EXTRACTIVE_MIN_CONFIDENCE = float(os.environ.get("RAG_EXTRACTIVE_MIN_CONFIDENCE", 0.3))
+EXTRACTIVE_TOP_CHUNKS = 3     # chunks recuperados que se pasan al lector
+# Cargar el lector (~1 GB) al arrancar, en segundo plano, en lugar de en la primera pregunta
+EXTRACTIVE_PRELOAD = os.environ.get("RAG_EXTRACTIVE_PRELOAD", "0") == "1"
@@ -0,0 +1,145 @@
+import hashlib
+import zlib
+from collections import defaultdict
+from typing import List, Dict, Any, Tuple
+
+import numpy as np
+
+try:
+    from config import DEDUP_NEAR_THRESHOLD, MINHASH_NUM_PERM, MINHASH_BANDS, SHINGLE_SIZE
+except ImportError:
+    DEDUP_NEAR_THRESHOLD = 0.85
+    MINHASH_NUM_PERM = 128
+    MINHASH_BANDS = 16
+    SHINGLE_SIZE = 3
+
+# Primo de Mersenne 2^31 - 1: a·x + b cabe en uint64 sin desbordar
+_PRIME = np.uint64((1 << 31) - 1)
+
+
+def normalize_text(text: str) -> str:
+    return " ".join((text or "").lower().split())
+
+
+def content_hash(text: str) -> str:
+    """Hash del texto normalizado (minúsculas, espacios colapsados)."""
+    return hashlib.sha1(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+# ==========================
+# DUPLICADOS EXACTOS (DOCUMENTOS)
+# ==========================
+
+def dedup_documents(docs: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """
+    Elimina documentos repetidos: mismo pageid de Wikipedia
+    (varias keywords que redirigen a la misma página) o mismo contenido.
+    Se conserva la primera aparición.
+    """
+    seen_pageids = set()
+    seen_hashes = set()
+    kept = []
+    stats = {"by_pageid": 0, "by_content": 0}
+
+    for doc in docs:
+        pageid = (doc.get("metadata") or {}).get("pageid")
+        if pageid is not None:
+            if pageid in seen_pageids:
+                stats["by_pageid"] += 1
+                continue
+            seen_pageids.add(pageid)
+
+        h = content_hash(doc.get("texto", ""))
+        if h in seen_hashes:
+            stats["by_content"] += 1
+            continue
+        seen_hashes.add(h)
+        kept.append(doc)
+
+    return kept, stats
+
+
+# ==========================
+# CASI DUPLICADOS (CHUNKS): MINHASH + LSH
+# ==========================
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> set:
+    words = normalize_text(text).split()
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+class MinHasher:
+    """Firmas MinHash con `num_perm` funciones hash (a·x + b) mod p."""
+
+    def __init__(self, num_perm: int = MINHASH_NUM_PERM, seed: int = 1):
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self.a = rng.randint(1, (1 << 31) - 1, size=num_perm).astype(np.uint64)
+        self.b = rng.randint(0, (1 << 31) - 1, size=num_perm).astype(np.uint64)
+
+    def signature(self, shingle_set: set) -> np.ndarray:
+        if not shingle_set:
+            return np.full(self.num_perm, _PRIME, dtype=np.uint64)
+        x = np.fromiter(
+            (zlib.crc32(s.encode("utf-8")) & 0x7FFFFFFF for s in shingle_set),
+            dtype=np.uint64,
+            count=len(shingle_set),
+        )
+        hashes = (self.a[:, None] * x[None, :] + self.b[:, None]) % _PRIME
+        return hashes.min(axis=1)
+
+
+def jaccard(a: set, b: set) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def dedup_near_chunks(
+    chunks: List[Dict[str, Any]],
+    threshold: float = DEDUP_NEAR_THRESHOLD,
+    num_perm: int = MINHASH_NUM_PERM,
+    bands: int = MINHASH_BANDS,
+) -> Tuple[List[Dict[str, Any]], List[Tuple[str, str, float]]]:
+    """
+    Elimina chunks casi duplicados. LSH sobre las firmas MinHash propone
+    candidatos y se confirma con el Jaccard exacto de los shingles.
+    Devuelve los chunks conservados y la lista (eliminado, conservado, jaccard).
+    """
+    if num_perm % bands:
+        raise ValueError("MINHASH_NUM_PERM debe ser múltiplo de MINHASH_BANDS")
+    rows = num_perm // bands
+    hasher = MinHasher(num_perm)
+
+    buckets: Dict[Tuple[int, bytes], List[int]] = defaultdict(list)
+    kept_shingles: Dict[int, set] = {}
+    kept = []
+    dropped = []
+
+    for i, chunk in enumerate(chunks):
+        sh = shingles(chunk.get("texto", ""))
+        sig = hasher.signature(sh)
+        keys = [(b, sig[b * rows:(b + 1) * rows].tobytes()) for b in range(bands)]
+
+        # Candidatos: chunks conservados que comparten alguna banda
+        candidates = {j for key in keys for j in buckets.get(key, ())}
+        match = None
+        for j in candidates:
+            sim = jaccard(sh, kept_shingles[j])
+            if sim >= threshold:
+                match = (j, sim)
+                break
+
+        if match is not None:
+            j, sim = match
+            dropped.append((chunk.get("id"), chunks[j].get("id"), round(sim, 3)))
+            continue
+
+        kept_shingles[i] = sh
+        kept.append(chunk)
+        for key in keys:
+            buckets[key].append(i)
+
+    return kept, dropped
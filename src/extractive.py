@@ -0,0 +1,115 @@
+import re
+import threading
+from typing import List, Dict, Any
+
+try:
+    from config import EXTRACTIVE_MODEL, EXTRACTIVE_MIN_CONFIDENCE, EXTRACTIVE_TOP_CHUNKS
+except ImportError:
+    EXTRACTIVE_MODEL = "deepset/xlm-roberta-base-squad2"
+    EXTRACTIVE_MIN_CONFIDENCE = 0.3
+    EXTRACTIVE_TOP_CHUNKS = 3
+
+# Preguntas que suelen tener como respuesta un fragmento literal (fecha, cifra, nombre, lugar)
+_FACTOID_RE = re.compile(
+    r"\b(cu[aá]ndo|cu[aá]nt[oa]s?|qui[eé]n(es)?|d[oó]nde|qu[eé] (a[nñ]o|d[ií]a|fecha|mes)|"
+    r"en qu[eé] (a[nñ]o|fecha|ciudad|pa[ií]s)|c[oó]mo se llama(ba)?|"
+    r"when|how many|how much|who|where|what year|which year|what date)\b",
+    re.IGNORECASE,
+)
+
+
+class ExtractiveUnavailableError(RuntimeError):
+    """No se ha podido cargar el modelo extractivo (sin red, sin caché, sin memoria...)."""
+
+
+def is_factoid(question: str) -> bool:
+    """Heurística: ¿la pregunta pide un dato concreto (fecha, número, nombre, lugar)?"""
+    return bool(_FACTOID_RE.search(question))
+
+
+class ExtractiveReader:
+    """
+    Lector extractivo: busca en los chunks recuperados el fragmento que
+    responde a la pregunta. El modelo se carga la primera vez que se usa
+    para no penalizar el arranque si el modo no se utiliza. Si la carga falla
+    no se reintenta en cada pregunta: se lanza ExtractiveUnavailableError.
+    """
+
+    def __init__(self, model_name: str = EXTRACTIVE_MODEL):
+        self.model_name = model_name
+        self._qa = None
+        self._load_error: Exception | None = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        from transformers import pipeline
+
+        print(f"[INFO] Cargando modelo extractivo ({self.model_name})...")
+        return pipeline("question-answering", model=self.model_name, tokenizer=self.model_name)
+
+    def _pipeline(self):
+        with self._lock:
+            if self._qa is None and self._load_error is None:
+                try:
+                    self._qa = self._load()
+                except Exception as e:
+                    self._load_error = e
+                    print(f"[WARN] No se pudo cargar el modelo extractivo ({self.model_name}): {e}")
+            if self._qa is None:
+                raise ExtractiveUnavailableError(
+                    f"Modelo extractivo {self.model_name} no disponible: "
+                    f"{type(self._load_error).__name__}: {self._load_error}"
+                )
+            return self._qa
+
+    def preload(self) -> None:
+        """Carga el modelo ya, para que la primera pregunta extractiva no lo pague."""
+        try:
+            self._pipeline()
+        except ExtractiveUnavailableError:
+            pass   # ya avisado; las preguntas extractivas irán al LLM
+
+    def extract(self, question: str, docs: List[Dict[str, Any]],
+                top_chunks: int = EXTRACTIVE_TOP_CHUNKS) -> Dict[str, Any] | None:
+        """
+        Ejecuta el modelo en lote sobre los `top_chunks` primeros documentos
+        y devuelve el mejor fragmento: {"answer", "confidence", "doc", "start", "end"}.
+        """
+        docs = [d for d in docs[:top_chunks] if d.get("texto")]
+        if not docs:
+            return None
+
+        qa = self._pipeline()
+        outputs = qa(
+            question=[question] * len(docs),
+            context=[d["texto"] for d in docs],
+            batch_size=len(docs),
+            max_answer_len=30,
+        )
+        if isinstance(outputs, dict):
+            outputs = [outputs]
+
+        best = None
+        for doc, out in zip(docs, outputs):
+            span = (out.get("answer") or "").strip()
+            if not span:
+                continue
+            if best is None or out["score"] > best["confidence"]:
+                best = {
+                    "answer": span,
+                    "confidence": float(out["score"]),
+                    "doc": doc,
+                    "start": out.get("start"),
+                    "end": out.get("end"),
+                }
+        return best
+
+
+_reader: ExtractiveReader | None = None
+
+
+def get_reader() -> ExtractiveReader:
+    global _reader
+    if _reader is None:
+        _reader = ExtractiveReader()
+    return _reader
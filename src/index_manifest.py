@@ -0,0 +1,54 @@
+import hashlib
+import json
+import time
+from pathlib import Path
+from typing import Dict, Any
+
+try:
+    from config import INDEX_DIR
+except ImportError:
+    BASE_DIR = Path(__file__).resolve().parent.parent
+    INDEX_DIR = BASE_DIR / "index"
+
+MANIFEST_PATH = INDEX_DIR / "manifest.json"
+
+
+def file_sha256(path: Path) -> str:
+    """Hash SHA-256 de un fichero, leído por bloques."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def write_manifest(index_path: Path, meta_path: Path, **info) -> Dict[str, Any]:
+    """
+    Guarda manifest.json junto al índice. `fingerprint` identifica
+    una versión concreta de índice + metadatos; lo que dependa del índice
+    (p. ej. respuestas precalculadas) se guarda con esta huella.
+    """
+    files = {
+        index_path.name: file_sha256(index_path),
+        meta_path.name: file_sha256(meta_path),
+    }
+    fingerprint = hashlib.sha256(
+        json.dumps(files, sort_keys=True).encode("utf-8")
+    ).hexdigest()[:16]
+
+    manifest = {
+        "fingerprint": fingerprint,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "files": files,
+        **info,
+    }
+    with open(MANIFEST_PATH, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
+
+
+def load_manifest() -> Dict[str, Any] | None:
+    if not MANIFEST_PATH.exists():
+        return None
+    with open(MANIFEST_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
@@ -153,20 +153,26 @@ def main():
     out_path = DATA_PROCESSED / "wiki_docs.jsonl"
 
     docs_guardados = 0
+    duplicados = 0
+    seen_ids = set()   # varias keywords pueden redirigir a la misma página
 
     with open(out_path, "w", encoding="utf-8") as f_out:
         for kw in KEYWORDS:
             try:
                 print(f"[INFO] Descargando: {kw} ...")
                 doc = fetch_wiki_page(kw, lang="en")
+                time.sleep(0.5)  # pequeña pausa tras cada petición a la API, aunque se omita la página
                 if doc is None:
                     continue
+                if doc["id"] in seen_ids:
+                    print(f"[INFO] '{kw}' redirige a una página ya guardada ({doc['metadata']['title']}), se omite")
+                    duplicados += 1
+                    continue
+                seen_ids.add(doc["id"])
 
                 f_out.write(json.dumps(doc, ensure_ascii=False) + "\n")
                 docs_guardados += 1
 
-                time.sleep(0.5)  # pequeña pausa
-
             except requests.HTTPError as e:
                 print(f"[HTTP ERROR] '{kw}': {e}")
             except Exception as e:
@@ -174,6 +180,7 @@ def main():
 
     print(f"[DONE] Documentos de Wikipedia guardados en: {out_path}")
     print(f"[DONE] Total de documentos guardados: {docs_guardados}")
+    print(f"[DONE] Páginas repetidas omitidas: {duplicados}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,335 @@
+import argparse
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Dict, Any
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# ==========================
+# CONFIGURACIÓN
+# ==========================
+
+try:
+    from config import (
+        LLM_BACKEND,
+        OLLAMA_URL,
+        LLAMA_MODEL,
+        OLLAMA_KEEP_ALIVE,
+        OLLAMA_CONNECT_TIMEOUT,
+        OLLAMA_FIRST_TOKEN_TIMEOUT,
+        OLLAMA_READ_TIMEOUT,
+        OLLAMA_MAX_RETRIES,
+        OLLAMA_POOL_SIZE,
+        OLLAMA_ENDPOINTS,
+    )
+except ImportError:
+    LLM_BACKEND = "ollama"
+    OLLAMA_URL = "http://localhost:11434/api/chat"
+    LLAMA_MODEL = "llama3.1:8b"
+    OLLAMA_KEEP_ALIVE = "30m"
+    OLLAMA_CONNECT_TIMEOUT = 5
+    OLLAMA_FIRST_TOKEN_TIMEOUT = 60
+    OLLAMA_READ_TIMEOUT = 120
+    OLLAMA_MAX_RETRIES = 2
+    OLLAMA_POOL_SIZE = 4
+    OLLAMA_ENDPOINTS = [OLLAMA_URL]
+
+
+class LLMTimeoutError(RuntimeError):
+    """La generación no ha terminado dentro del tiempo máximo."""
+
+
+class LLMUnavailableError(RuntimeError):
+    """
+    La instancia no ha aceptado la petición (conexión rechazada o 502/503/504).
+    No se ha generado nada, así que se puede repetir en otra instancia.
+    """
+
+
+# ==========================
+# INTERFAZ COMÚN
+# ==========================
+
+class LLMBackend:
+    """
+    Interfaz mínima de un backend de generación.
+    `chat` recibe mensajes en formato Ollama/OpenAI y devuelve el texto generado.
+    """
+
+    name = "base"
+
+    def chat(self, messages: List[Dict[str, str]], options: Dict[str, Any] | None = None) -> str:
+        raise NotImplementedError
+
+    def generate(self, messages: List[Dict[str, str]], options: Dict[str, Any] | None = None) -> Dict[str, Any]:
+        """
+        Como `chat`, pero devuelve también los tokens que informa el backend:
+        {"text", "prompt_tokens", "completion_tokens"} (None si no los da).
+        """
+        return {"text": self.chat(messages, options=options), "prompt_tokens": None, "completion_tokens": None}
+
+    def warmup(self) -> None:
+        """Prepara el backend (p. ej. cargar el modelo) antes de la primera pregunta."""
+
+    def close(self) -> None:
+        """Libera conexiones u otros recursos."""
+
+
+# ==========================
+# OLLAMA (CONEXIONES REUTILIZABLES)
+# ==========================
+
+class OllamaBackend(LLMBackend):
+    """
+    Cliente de Ollama con un pool de conexiones keep-alive, reintentos
+    y timeouts separados de conexión, primer token y respuesta completa.
+    """
+
+    name = "ollama"
+
+    def __init__(
+        self,
+        url: str = OLLAMA_URL,
+        model: str = LLAMA_MODEL,
+        keep_alive: str = OLLAMA_KEEP_ALIVE,
+        connect_timeout: float = OLLAMA_CONNECT_TIMEOUT,
+        first_token_timeout: float = OLLAMA_FIRST_TOKEN_TIMEOUT,
+        read_timeout: float = OLLAMA_READ_TIMEOUT,
+        max_retries: int = OLLAMA_MAX_RETRIES,
+        pool_size: int = OLLAMA_POOL_SIZE,
+    ):
+        self.url = url
+        self.model = model
+        self.keep_alive = keep_alive
+        self.connect_timeout = connect_timeout
+        self.first_token_timeout = first_token_timeout
+        self.read_timeout = read_timeout
+
+        # Solo reintentamos fallos de conexión y errores 502/503/504:
+        # repetir una lectura cortada duplicaría una generación completa.
+        retry = Retry(
+            total=max_retries,
+            connect=max_retries,
+            read=0,
+            status=max_retries,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=None,
+            backoff_factor=0.5,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def warmup(self) -> None:
+        """
+        Carga el modelo en Ollama (una petición sin mensajes con keep_alive)
+        para que la primera pregunta no pague la carga en frío.
+        """
+        payload = {"model": self.model, "messages": [], "keep_alive": self.keep_alive}
+        try:
+            resp = self.session.post(
+                self.url, json=payload, timeout=(self.connect_timeout, self.read_timeout)
+            )
+            resp.raise_for_status()
+            print(f"[INFO] Modelo {self.model} precargado en {self.url}")
+        except requests.RequestException as e:
+            print(f"[WARN] No se pudo precargar {self.model} en {self.url}: {e}")
+
+    def chat(self, messages: List[Dict[str, str]], options: Dict[str, Any] | None = None) -> str:
+        return self.generate(messages, options=options)["text"]
+
+    def generate(self, messages: List[Dict[str, str]], options: Dict[str, Any] | None = None) -> Dict[str, Any]:
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "stream": True,
+            "keep_alive": self.keep_alive,
+            "options": options or {},
+        }
+
+        # En streaming, el timeout de lectura de requests se aplica a cada lectura
+        # del socket: limita la espera hasta el primer token y entre tokens.
+        # El tiempo total se controla aparte con `deadline`.
+        deadline = time.monotonic() + self.read_timeout
+        parts = []
+        usage: Dict[str, Any] = {}
+        try:
+            resp = self.session.post(
+                self.url,
+                json=payload,
+                stream=True,
+                timeout=(self.connect_timeout, self.first_token_timeout),
+            )
+        except requests.ConnectionError as e:
+            raise LLMUnavailableError(f"No se puede conectar con {self.url}: {e}") from e
+        with resp:
+            if resp.status_code in (502, 503, 504):
+                raise LLMUnavailableError(f"{self.url} no disponible (HTTP {resp.status_code})")
+            resp.raise_for_status()
+            for line in resp.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if "error" in chunk:
+                    raise RuntimeError(f"Error de Ollama: {chunk['error']}")
+                parts.append(chunk.get("message", {}).get("content", ""))
+                if chunk.get("done"):
+                    # El último fragmento trae los tokens reales del prompt y de la respuesta
+                    usage = chunk
+                    break
+                if time.monotonic() > deadline:
+                    raise LLMTimeoutError(
+                        f"La respuesta de {self.url} supera {self.read_timeout}s"
+                    )
+        return {
+            "text": "".join(parts),
+            "prompt_tokens": usage.get("prompt_eval_count"),
+            "completion_tokens": usage.get("eval_count"),
+        }
+
+    def close(self) -> None:
+        self.session.close()
+
+
+# ==========================
+# STUB DETERMINISTA
+# ==========================
+
+def stub_answer(messages: List[Dict[str, str]]) -> str:
+    """
+    Respuesta determinista a partir de los mensajes: misma entrada, misma salida.
+    """
+    raw = json.dumps(messages, ensure_ascii=False, sort_keys=True)
+    digest = hashlib.sha256(raw.encode("utf-8")).hexdigest()[:12]
+    user_msgs = [m.get("content", "") for m in messages if m.get("role") == "user"]
+    n_chars = len(user_msgs[-1]) if user_msgs else 0
+    return f"Respuesta simulada {digest} (prompt de {n_chars} caracteres)."
+
+
+class StubBackend(LLMBackend):
+    """
+    Backend local sin red para tests y benchmarks.
+    `latency` simula el tiempo de generación (segundos).
+    """
+
+    name = "stub"
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+
+    def chat(self, messages: List[Dict[str, str]], options: Dict[str, Any] | None = None) -> str:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return stub_answer(messages)
+
+
+class _StubOllamaHandler(BaseHTTPRequestHandler):
+    """
+    Imita /api/chat de Ollama (streaming NDJSON) con respuestas del stub.
+    Habla HTTP/1.1 con codificación chunked, así la conexión sigue abierta
+    entre peticiones y el pool keep-alive de OllamaBackend se reutiliza.
+    """
+
+    protocol_version = "HTTP/1.1"
+    latency = 0.0
+
+    def _write_chunk(self, data: bytes) -> None:
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        messages = body.get("messages", [])
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        if messages:
+            if self.latency:
+                time.sleep(self.latency)
+
+            words = stub_answer(messages).split(" ")
+            for i, word in enumerate(words):
+                token = word if i == 0 else " " + word
+                chunk = {"model": body.get("model"), "message": {"role": "assistant", "content": token}, "done": False}
+                self._write_chunk(json.dumps(chunk, ensure_ascii=False).encode("utf-8") + b"\n")
+            # Como Ollama, el último fragmento lleva el recuento de tokens (aquí, palabras)
+            done = {
+                "model": body.get("model"),
+                "done": True,
+                "prompt_eval_count": sum(len(m.get("content", "").split()) for m in messages),
+                "eval_count": len(words),
+            }
+        else:
+            # Sin mensajes es una petición de precarga: Ollama responde done sin contenido
+            done = {"model": body.get("model"), "done": True}
+        self._write_chunk(json.dumps(done).encode() + b"\n")
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_stub(host: str = "127.0.0.1", port: int = 11435, latency: float = 0.0) -> ThreadingHTTPServer:
+    """
+    Arranca en segundo plano un servidor HTTP que imita a Ollama.
+    Útil para probar OllamaBackend (pool, reintentos, timeouts) sin GPU.
+    """
+    handler = type("StubOllamaHandler", (_StubOllamaHandler,), {"latency": latency})
+    server = ThreadingHTTPServer((host, port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+# ==========================
+# FACTORÍA
+# ==========================
+
+_BACKENDS: Dict[str, LLMBackend] = {}
+
+
+def get_backend(name: str | None = None) -> LLMBackend:
+    """
+    Devuelve (y reutiliza) el backend configurado:
+    - "ollama": planificador sobre todas las instancias de OLLAMA_ENDPOINTS
+    - "stub": respuestas deterministas sin red
+    """
+    name = name or LLM_BACKEND
+    if name not in _BACKENDS:
+        if name == "ollama":
+            from llm_scheduler import GenerationScheduler
+            _BACKENDS[name] = GenerationScheduler([OllamaBackend(url=u) for u in OLLAMA_ENDPOINTS])
+        elif name == "stub":
+            _BACKENDS[name] = StubBackend()
+        else:
+            raise ValueError(f"Backend LLM desconocido: {name}")
+    return _BACKENDS[name]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor stub compatible con la API de chat de Ollama.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--latency", type=float, default=0.0, help="segundos de generación simulada")
+    args = parser.parse_args()
+
+    server = serve_stub(args.host, args.port, args.latency)
+    print(f"[READY] Stub de Ollama en http://{args.host}:{args.port}/api/chat (Ctrl+C para salir)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,222 @@
+import threading
+import time
+from typing import List, Dict, Any, Tuple
+
+from llm_backends import LLMBackend, LLMUnavailableError
+
+# ==========================
+# CONFIGURACIÓN
+# ==========================
+
+try:
+    from config import (
+        SCHEDULER_MAX_INFLIGHT_PER_ENDPOINT,
+        SCHEDULER_MAX_QUEUE,
+        SCHEDULER_QUEUE_TIMEOUT,
+        SCHEDULER_FAILURES_BEFORE_DOWN,
+        SCHEDULER_RETRY_DOWN_AFTER,
+    )
+except ImportError:
+    SCHEDULER_MAX_INFLIGHT_PER_ENDPOINT = 2
+    SCHEDULER_MAX_QUEUE = 16
+    SCHEDULER_QUEUE_TIMEOUT = 30
+    SCHEDULER_FAILURES_BEFORE_DOWN = 3
+    SCHEDULER_RETRY_DOWN_AFTER = 15
+
+
+class SchedulerBusyError(RuntimeError):
+    """No hay capacidad para atender la petición ahora mismo (cola llena o sin instancias)."""
+
+
+# ==========================
+# ESTADO POR INSTANCIA
+# ==========================
+
+class EndpointState:
+    """Contadores y salud de una instancia de Ollama."""
+
+    def __init__(self, backend: LLMBackend):
+        self.backend = backend
+        self.outstanding = 0
+        self.completed = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.down_until = 0.0
+        self.total_latency = 0.0
+        self.last_error: str | None = None
+
+    @property
+    def label(self) -> str:
+        return getattr(self.backend, "url", self.backend.name)
+
+    def is_available(self, now: float) -> bool:
+        # Una instancia caída vuelve a recibir tráfico cuando pasa `down_until`
+        return now >= self.down_until
+
+    def snapshot(self, now: float) -> Dict[str, Any]:
+        return {
+            "endpoint": self.label,
+            "healthy": self.is_available(now) and self.consecutive_failures == 0,
+            "outstanding": self.outstanding,
+            "completed": self.completed,
+            "failures": self.failures,
+            "avg_latency_s": round(self.total_latency / self.completed, 3) if self.completed else None,
+            "last_error": self.last_error,
+        }
+
+
+# ==========================
+# PLANIFICADOR
+# ==========================
+
+class GenerationScheduler(LLMBackend):
+    """
+    Reparte las generaciones entre varias instancias de Ollama eligiendo
+    la que tiene menos peticiones en curso (las que acaban de fallar, al final).
+    Limita las generaciones simultáneas por instancia y la longitud de la cola;
+    si la cola está llena falla inmediatamente con SchedulerBusyError en lugar
+    de acumular peticiones. Si una instancia no acepta la conexión, la petición
+    se repite una vez en otra.
+    """
+
+    name = "pool"
+
+    def __init__(
+        self,
+        backends: List[LLMBackend],
+        max_inflight_per_endpoint: int = SCHEDULER_MAX_INFLIGHT_PER_ENDPOINT,
+        max_queue: int = SCHEDULER_MAX_QUEUE,
+        queue_timeout: float = SCHEDULER_QUEUE_TIMEOUT,
+        failures_before_down: int = SCHEDULER_FAILURES_BEFORE_DOWN,
+        retry_down_after: float = SCHEDULER_RETRY_DOWN_AFTER,
+    ):
+        if not backends:
+            raise ValueError("El planificador necesita al menos una instancia")
+        self.endpoints = [EndpointState(b) for b in backends]
+        self.max_inflight_per_endpoint = max_inflight_per_endpoint
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.failures_before_down = failures_before_down
+        self.retry_down_after = retry_down_after
+
+        self._cond = threading.Condition()
+        self._waiting = 0
+        self._rejected = 0
+
+    def _pick(self, now: float, exclude: Tuple[EndpointState, ...] = ()) -> EndpointState | None:
+        candidates = [
+            ep for ep in self.endpoints
+            if ep not in exclude and ep.is_available(now) and ep.outstanding < self.max_inflight_per_endpoint
+        ]
+        if not candidates:
+            return None
+        # Una instancia que acaba de fallar responde enseguida y tendría pocas
+        # peticiones en curso: va detrás de todas las sanas, no solo en empates
+        return min(candidates, key=lambda ep: (ep.consecutive_failures > 0, ep.outstanding, ep.consecutive_failures))
+
+    def _check_any_available(self, now: float, exclude: Tuple[EndpointState, ...] = ()) -> None:
+        # Con todas las instancias caídas no tiene sentido esperar en cola:
+        # fallamos ya en lugar de bloquear hasta `down_until` o `queue_timeout`
+        if not any(ep.is_available(now) for ep in self.endpoints if ep not in exclude):
+            self._rejected += 1
+            raise SchedulerBusyError(
+                "Ninguna instancia de Ollama disponible ahora mismo. Inténtalo de nuevo en unos segundos."
+            )
+
+    def _acquire(self, exclude: Tuple[EndpointState, ...] = ()) -> EndpointState:
+        with self._cond:
+            now = time.monotonic()
+            ep = self._pick(now, exclude)
+            if ep is None:
+                self._check_any_available(now, exclude)
+                # Solo se espera si hay instancias sanas pero todas están al máximo de carga
+                if self._waiting >= self.max_queue:
+                    self._rejected += 1
+                    raise SchedulerBusyError(
+                        f"Servidor ocupado: {self._waiting} peticiones en cola. Inténtalo de nuevo en unos segundos."
+                    )
+                self._waiting += 1
+                try:
+                    deadline = time.monotonic() + self.queue_timeout
+                    while ep is None:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self._rejected += 1
+                            raise SchedulerBusyError(
+                                f"Servidor ocupado: sin turno tras {self.queue_timeout}s en cola."
+                            )
+                        self._cond.wait(timeout=min(remaining, 1.0))
+                        now = time.monotonic()
+                        ep = self._pick(now, exclude)
+                        if ep is None:
+                            self._check_any_available(now, exclude)
+                finally:
+                    self._waiting -= 1
+            ep.outstanding += 1
+            return ep
+
+    def _release(self, ep: EndpointState, elapsed: float, error: Exception | None) -> None:
+        with self._cond:
+            ep.outstanding -= 1
+            if error is None:
+                ep.completed += 1
+                ep.total_latency += elapsed
+                ep.consecutive_failures = 0
+            else:
+                ep.failures += 1
+                ep.consecutive_failures += 1
+                ep.last_error = f"{type(error).__name__}: {error}"
+                if ep.consecutive_failures >= self.failures_before_down:
+                    ep.down_until = time.monotonic() + self.retry_down_after
+                    print(f"[WARN] Instancia {ep.label} marcada como caída durante {self.retry_down_after}s")
+            # Todos los que esperan deben reevaluar: la instancia puede haberse
+            # marcado como caída y entonces tienen que fallar sin esperar más
+            self._cond.notify_all()
+
+    def chat(self, messages: List[Dict[str, str]], options: Dict[str, Any] | None = None) -> str:
+        return self.generate(messages, options=options)["text"]
+
+    def generate(self, messages: List[Dict[str, str]], options: Dict[str, Any] | None = None) -> Dict[str, Any]:
+        tried: Tuple[EndpointState, ...] = ()
+        while True:
+            ep = self._acquire(exclude=tried)
+            t0 = time.monotonic()
+            try:
+                result = ep.backend.generate(messages, options=options)
+            except LLMUnavailableError as e:
+                # No se ha generado nada: se puede repetir una vez en otra instancia
+                self._release(ep, time.monotonic() - t0, e)
+                tried += (ep,)
+                if len(tried) > 1:
+                    raise SchedulerBusyError(
+                        "Ninguna instancia de Ollama responde ahora mismo. Inténtalo de nuevo en unos segundos."
+                    ) from e
+                continue
+            except Exception as e:
+                self._release(ep, time.monotonic() - t0, e)
+                raise
+            self._release(ep, time.monotonic() - t0, None)
+            return result
+
+    def warmup(self) -> None:
+        threads = [threading.Thread(target=ep.backend.warmup) for ep in self.endpoints]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    def close(self) -> None:
+        for ep in self.endpoints:
+            ep.backend.close()
+
+    def metrics(self) -> Dict[str, Any]:
+        """Profundidad de cola, rechazos y salud de cada instancia."""
+        now = time.monotonic()
+        with self._cond:
+            return {
+                "queue_depth": self._waiting,
+                "max_queue": self.max_queue,
+                "rejected": self._rejected,
+                "inflight": sum(ep.outstanding for ep in self.endpoints),
+                "endpoints": [ep.snapshot(now) for ep in self.endpoints],
+            }
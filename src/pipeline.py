@@ -0,0 +1,261 @@
+import argparse
+import hashlib
+import json
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Dict, Any
+
+import config
+from config import BASE_DIR, DATA_RAW, DATA_PROCESSED, INDEX_DIR, LOGS_DIR
+from index_manifest import file_sha256
+
+SRC_DIR = Path(__file__).resolve().parent
+STATE_PATH = DATA_PROCESSED / ".pipeline_state.json"
+PIPELINE_LOGS_DIR = LOGS_DIR / "pipeline"
+
+
+# ==========================
+# DEFINICIÓN DEL PIPELINE
+# ==========================
+
+@dataclass
+class Stage:
+    """
+    Una etapa del pipeline: un script de src/ con sus entradas y salidas.
+    `code` son los módulos de los que depende (un cambio en ellos obliga a repetir)
+    y `config_keys` los valores de config.py que influyen en el resultado.
+    """
+    name: str
+    script: str
+    deps: List[str] = field(default_factory=list)
+    inputs: List[Path] = field(default_factory=list)
+    outputs: List[Path] = field(default_factory=list)
+    code: List[str] = field(default_factory=list)
+    config_keys: List[str] = field(default_factory=list)
+
+
+STAGES = [
+    Stage(
+        name="ingest_wikipedia",
+        script="ingest_wikipedia.py",
+        outputs=[DATA_PROCESSED / "wiki_docs.jsonl"],
+    ),
+    Stage(
+        name="ingest_geo_pdf",
+        script="ingest_geo_pdf.py",
+        inputs=[DATA_RAW / "pdfs" / "country-regions.pdf"],
+        outputs=[DATA_PROCESSED / "geo_pdf_docs.jsonl"],
+    ),
+    Stage(
+        name="build_dataset",
+        script="build_dataset.py",
+        deps=["ingest_wikipedia", "ingest_geo_pdf"],
+        inputs=[DATA_PROCESSED / "wiki_docs.jsonl", DATA_PROCESSED / "geo_pdf_docs.jsonl"],
+        outputs=[DATA_PROCESSED / "documentos.jsonl"],
+        code=["dedup.py"],
+        config_keys=["CHUNK_SIZE", "CHUNK_OVERLAP", "DEDUP_NEAR_THRESHOLD",
+                     "MINHASH_NUM_PERM", "MINHASH_BANDS", "SHINGLE_SIZE"],
+    ),
+    Stage(
+        name="build_index",
+        script="build_index.py",
+        deps=["build_dataset"],
+        inputs=[DATA_PROCESSED / "documentos.jsonl"],
+        outputs=[INDEX_DIR / "faiss_index.bin", INDEX_DIR / "metadatos.json", INDEX_DIR / "manifest.json"]
+        + ([INDEX_DIR / "parents.json"] if config.SMALL_TO_BIG else []),
+        code=["similarity.py", "index_manifest.py"],
+        config_keys=["EMBEDDING_MODEL_NAME", "SMALL_TO_BIG", "SMALL_CHUNK_SIZE", "SMALL_CHUNK_OVERLAP"],
+    ),
+]
+
+
+# ==========================
+# HUELLAS Y ESTADO
+# ==========================
+
+def stage_fingerprint(stage: Stage) -> str:
+    """Huella de todo lo que determina el resultado de una etapa."""
+    parts: Dict[str, Any] = {
+        "code": {f: file_sha256(SRC_DIR / f) for f in [stage.script, *stage.code]},
+        "inputs": {
+            str(p.relative_to(BASE_DIR)): file_sha256(p) if p.exists() else None
+            for p in stage.inputs
+        },
+        "config": {k: getattr(config, k) for k in stage.config_keys},
+    }
+    raw = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def output_hashes(stage: Stage) -> Dict[str, str] | None:
+    """Hashes de las salidas, o None si falta alguna."""
+    if not all(p.exists() for p in stage.outputs):
+        return None
+    return {str(p.relative_to(BASE_DIR)): file_sha256(p) for p in stage.outputs}
+
+
+def load_state() -> Dict[str, Any]:
+    if not STATE_PATH.exists():
+        return {}
+    with open(STATE_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_state(state: Dict[str, Any]) -> None:
+    STATE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with open(STATE_PATH, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+
+
+def is_up_to_date(stage: Stage, fingerprint: str, state: Dict[str, Any]) -> bool:
+    """
+    Al día si la huella coincide con la última ejecución correcta
+    y las salidas siguen siendo las que produjo (nadie las ha tocado a mano).
+    """
+    prev = state.get(stage.name)
+    if not prev or prev.get("fingerprint") != fingerprint:
+        return False
+    outputs = output_hashes(stage)
+    # Sin salidas nunca está al día, aunque el estado guardado también diga None
+    return outputs is not None and outputs == prev.get("outputs")
+
+
+# ==========================
+# EJECUCIÓN
+# ==========================
+
+def run_stage(stage: Stage) -> tuple[bool, float, Path]:
+    """Ejecuta el script de la etapa en un proceso aparte, con su salida en un log."""
+    PIPELINE_LOGS_DIR.mkdir(parents=True, exist_ok=True)
+    log_path = PIPELINE_LOGS_DIR / f"{stage.name}.log"
+    t0 = time.perf_counter()
+    with open(log_path, "w", encoding="utf-8") as log:
+        proc = subprocess.run(
+            [sys.executable, stage.script],
+            cwd=SRC_DIR,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+        )
+    return proc.returncode == 0, time.perf_counter() - t0, log_path
+
+
+def select_stages(targets: List[str]) -> List[Stage]:
+    """Las etapas pedidas y todas sus dependencias (todas si no se pide ninguna)."""
+    by_name = {s.name: s for s in STAGES}
+    if not targets:
+        return list(STAGES)
+    needed = set()
+    pending = list(targets)
+    while pending:
+        name = pending.pop()
+        if name not in by_name:
+            raise ValueError(f"Etapa desconocida: {name}. Disponibles: {', '.join(by_name)}")
+        if name not in needed:
+            needed.add(name)
+            pending.extend(by_name[name].deps)
+    return [s for s in STAGES if s.name in needed]
+
+
+def run_pipeline(targets: List[str], force: List[str], dry_run: bool, workers: int) -> Dict[str, Dict[str, Any]]:
+    stages = select_stages(targets)
+    names = {s.name for s in stages}
+    force_all = "all" in force
+    state = load_state()
+    results: Dict[str, Dict[str, Any]] = {}
+
+    def ready(stage: Stage) -> bool:
+        return all(d in results or d not in names for d in stage.deps)
+
+    pending = list(stages)
+    running = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while pending or running:
+            # Lanzar todas las etapas cuyas dependencias ya terminaron
+            for stage in [s for s in pending if ready(s)]:
+                pending.remove(stage)
+
+                failed_deps = [d for d in stage.deps if results.get(d, {}).get("status") in ("fallida", "bloqueada")]
+                if failed_deps:
+                    results[stage.name] = {"status": "bloqueada", "seconds": 0.0}
+                    print(f"[WARN] {stage.name}: bloqueada por {', '.join(failed_deps)}")
+                    continue
+
+                fingerprint = stage_fingerprint(stage)
+                forced = force_all or stage.name in force
+                # En dry-run las entradas de una dependencia pendiente aún no existen
+                upstream_pending = any(results.get(d, {}).get("status") == "pendiente" for d in stage.deps)
+                if not forced and not upstream_pending and is_up_to_date(stage, fingerprint, state):
+                    results[stage.name] = {"status": "al día", "seconds": 0.0}
+                    print(f"[INFO] {stage.name}: al día, se omite")
+                    continue
+                if dry_run:
+                    results[stage.name] = {"status": "pendiente", "seconds": 0.0}
+                    print(f"[INFO] {stage.name}: se ejecutaría")
+                    continue
+
+                print(f"[INFO] {stage.name}: ejecutando {stage.script} ...")
+                running[pool.submit(run_stage, stage)] = (stage, fingerprint)
+
+            if not running:
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                stage, fingerprint = running.pop(fut)
+                ok, seconds, log_path = fut.result()
+                outputs = output_hashes(stage) if ok else None
+                if ok and outputs is None:
+                    # El script terminó sin error pero no generó todas sus salidas
+                    # (p. ej. build_dataset sin documentos de entrada)
+                    missing = [str(p.relative_to(BASE_DIR)) for p in stage.outputs if not p.exists()]
+                    state.pop(stage.name, None)
+                    save_state(state)
+                    results[stage.name] = {"status": "fallida", "seconds": seconds}
+                    print(f"[ERROR] {stage.name}: terminó sin generar {', '.join(missing)}, revisa {log_path}")
+                elif ok:
+                    state[stage.name] = {
+                        "fingerprint": fingerprint,
+                        "outputs": outputs,
+                        "finished_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                        "seconds": round(seconds, 2),
+                    }
+                    save_state(state)
+                    results[stage.name] = {"status": "ejecutada", "seconds": seconds}
+                    print(f"[DONE] {stage.name}: {seconds:.1f}s (log: {log_path})")
+                else:
+                    results[stage.name] = {"status": "fallida", "seconds": seconds}
+                    print(f"[ERROR] {stage.name}: falló tras {seconds:.1f}s, revisa {log_path}")
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Ejecuta el pipeline ingest -> dataset -> índice, saltando las etapas que están al día."
+    )
+    parser.add_argument("targets", nargs="*", help="etapas a construir (con sus dependencias); por defecto todas")
+    parser.add_argument("--force", nargs="+", default=[], metavar="ETAPA",
+                        help="etapas a repetir aunque estén al día ('all' para todas)")
+    parser.add_argument("--dry-run", action="store_true", help="solo mostrar qué se ejecutaría")
+    parser.add_argument("--workers", type=int, default=2, help="etapas independientes en paralelo")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    results = run_pipeline(args.targets, args.force, args.dry_run, args.workers)
+    total = time.perf_counter() - t0
+
+    print("\n[RESUMEN]")
+    for name, r in results.items():
+        print(f"  {name:<18} {r['status']:<10} {r['seconds']:>8.1f}s")
+    print(f"  {'total':<18} {'':<10} {total:>8.1f}s")
+
+    if any(r["status"] in ("fallida", "bloqueada") for r in results.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
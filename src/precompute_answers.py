@@ -0,0 +1,188 @@
+import argparse
+import json
+import re
+import time
+import unicodedata
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Dict, Any
+
+try:
+    from config import INDEX_DIR
+except ImportError:
+    BASE_DIR = Path(__file__).resolve().parent.parent
+    INDEX_DIR = BASE_DIR / "index"
+
+from index_manifest import load_manifest
+
+STORE_PATH = INDEX_DIR / "precomputed_answers.json"
+STORE_VERSION = 1
+
+
+def normalize_question(question: str) -> str:
+    """
+    Normaliza una pregunta para comparar: minúsculas, sin tildes,
+    sin signos de puntuación y con los espacios colapsados.
+    """
+    text = unicodedata.normalize("NFKD", question.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = re.sub(r"[^\w\s]", " ", text)
+    return " ".join(text.split())
+
+
+# ==========================
+# ALMACÉN DE RESPUESTAS
+# ==========================
+
+class AnswerStore:
+    """
+    Respuestas precalculadas indexadas por pregunta normalizada.
+    Las fuentes se guardan como posiciones en metadatos.json, por eso
+    el almacén solo es válido para el índice con la misma huella.
+    Las respuestas dependen además del modelo, los prompts y los parámetros
+    de recuperación: `settings_hash` los resume (ver rag_chat.generation_settings_hash).
+    """
+
+    def __init__(self, fingerprint: str, k: int, answers: Dict[str, Dict[str, Any]] | None = None,
+                 settings_hash: str | None = None):
+        self.fingerprint = fingerprint
+        self.k = k
+        self.answers = answers or {}
+        self.settings_hash = settings_hash
+
+    def __len__(self):
+        return len(self.answers)
+
+    def add(self, question: str, answer: str, source_positions: List[int]) -> None:
+        self.answers[normalize_question(question)] = {
+            "question": question,
+            "answer": answer,
+            "sources": source_positions,
+        }
+
+    def lookup(self, question: str, k: int) -> Dict[str, Any] | None:
+        if k != self.k:
+            return None
+        return self.answers.get(normalize_question(question))
+
+    def save(self, path: Path = STORE_PATH) -> None:
+        data = {
+            "version": STORE_VERSION,
+            "index_fingerprint": self.fingerprint,
+            "settings_hash": self.settings_hash,
+            "k": self.k,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "answers": self.answers,
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: Path = STORE_PATH, settings_hash: str | None = None) -> "AnswerStore | None":
+        """
+        Carga el almacén si existe y corresponde al índice actual (manifest.json)
+        y, si se indica, a la misma configuración de generación (`settings_hash`).
+        Si el índice o la configuración han cambiado desde entonces, lo ignora.
+        """
+        if not path.exists():
+            return None
+        manifest = load_manifest()
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        if data.get("version") != STORE_VERSION:
+            print(f"[WARN] Respuestas precalculadas con versión {data.get('version')} no soportada, se ignoran.")
+            return None
+        if manifest is None or data.get("index_fingerprint") != manifest.get("fingerprint"):
+            print("[WARN] Respuestas precalculadas de otro índice, se ignoran. Vuelve a ejecutar precompute_answers.py")
+            return None
+        if settings_hash is not None and data.get("settings_hash") != settings_hash:
+            print("[WARN] Respuestas precalculadas con otro modelo, prompt o parámetros de recuperación, "
+                  "se ignoran. Vuelve a ejecutar precompute_answers.py")
+            return None
+
+        return cls(data["index_fingerprint"], data["k"], data.get("answers", {}), data.get("settings_hash"))
+
+
+# ==========================
+# PREGUNTAS FRECUENTES
+# ==========================
+
+def load_questions(path: Path, top: int | None = None) -> List[str]:
+    """
+    Lee preguntas de un .txt (una por línea) o de un log .jsonl con campo "question".
+    Agrupa por pregunta normalizada y devuelve las `top` más frecuentes.
+    """
+    counts: Counter = Counter()
+    first_seen: Dict[str, str] = {}
+
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if path.suffix == ".jsonl":
+                try:
+                    rec = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                # Las propias ejecuciones de este script no cuentan como tráfico
+                if rec.get("source") == "precompute":
+                    continue
+                q = rec.get("question", "")
+            else:
+                q = line
+            norm = normalize_question(q)
+            if not norm:
+                continue
+            counts[norm] += 1
+            first_seen.setdefault(norm, q)
+
+    return [first_seen[norm] for norm, _ in counts.most_common(top)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precalcula respuestas para las preguntas más frecuentes.")
+    parser.add_argument("questions", type=Path, help="fichero .txt (una pregunta por línea) o log .jsonl")
+    parser.add_argument("--top", type=int, default=500, help="número de preguntas más frecuentes a precalcular")
+    parser.add_argument("--k", type=int, default=5, help="chunks recuperados por pregunta")
+    parser.add_argument("--workers", type=int, default=1, help="preguntas en paralelo (útil con varias instancias de Ollama)")
+    args = parser.parse_args()
+
+    questions = load_questions(args.questions, top=args.top)
+    print(f"[INFO] Preguntas a precalcular: {len(questions)}")
+
+    manifest = load_manifest()
+    if manifest is None:
+        raise FileNotFoundError("No hay manifest.json: ejecuta build_index.py antes de precalcular respuestas")
+
+    # Importamos aquí: rag_chat carga índice, embeddings y LLM al importarse
+    from rag_chat import answer_with_rag, generation_settings_hash
+
+    store = AnswerStore(manifest["fingerprint"], args.k, settings_hash=generation_settings_hash())
+
+    def run(q: str):
+        try:
+            return q, answer_with_rag(q, k=args.k, use_precomputed=False, source="precompute")
+        except Exception as e:
+            print(f"[ERROR] '{q}': {e}")
+            return q, None
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        for i, (q, result) in enumerate(pool.map(run, questions), start=1):
+            if result is None:
+                continue
+            positions = [d["index_pos"] for d in result["context_docs"] if "index_pos" in d]
+            store.add(q, result["answer"], positions)
+            if i % 10 == 0:
+                print(f"[INFO] {i}/{len(questions)} preguntas procesadas")
+
+    store.save()
+    print(f"[DONE] {len(store)} respuestas guardadas en {STORE_PATH} en {time.perf_counter() - t0:.1f}s")
+    print(f"[DONE] Índice: fingerprint={store.fingerprint}  configuración: {store.settings_hash}")
+
+
+if __name__ == "__main__":
+    main()
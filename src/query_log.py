@@ -0,0 +1,81 @@
+import atexit
+import json
+import logging
+import queue
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from pathlib import Path
+from typing import Dict, Any
+
+try:
+    from config import QUERY_LOG_FILE, QUERY_LOG_MAX_BYTES, QUERY_LOG_BACKUPS
+except ImportError:
+    BASE_DIR = Path(__file__).resolve().parent.parent
+    QUERY_LOG_FILE = BASE_DIR / "logs" / "query_log.jsonl"
+    QUERY_LOG_MAX_BYTES = 10 * 1024 * 1024
+    QUERY_LOG_BACKUPS = 5
+
+
+class _JsonLineFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        return json.dumps(record.payload, ensure_ascii=False)
+
+
+_logger: logging.Logger | None = None
+_listener: QueueListener | None = None
+
+
+def _get_logger() -> logging.Logger:
+    """
+    Logger con QueueHandler: el hilo de la petición solo encola el registro
+    y un hilo aparte (QueueListener) lo escribe en disco con rotación.
+    """
+    global _logger, _listener
+    if _logger is not None:
+        return _logger
+
+    QUERY_LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
+    file_handler = RotatingFileHandler(
+        QUERY_LOG_FILE,
+        maxBytes=QUERY_LOG_MAX_BYTES,
+        backupCount=QUERY_LOG_BACKUPS,
+        encoding="utf-8",
+    )
+    file_handler.setFormatter(_JsonLineFormatter())
+
+    q: queue.Queue = queue.Queue(-1)
+    _listener = QueueListener(q, file_handler)
+    _listener.start()
+    atexit.register(close)
+
+    logger = logging.getLogger("rag_ww2.query_log")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger.addHandler(QueueHandler(q))
+    _logger = logger
+    return logger
+
+
+def close() -> None:
+    """Vacía la cola pendiente y detiene el hilo escritor."""
+    global _logger, _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+    if _logger is not None:
+        _logger.handlers.clear()
+    _logger = None
+    _listener = None
+
+
+def log_query(record: Dict[str, Any]) -> None:
+    """
+    Añade un registro al log de consultas sin bloquear la respuesta.
+    Un fallo al registrar nunca debe romper la petición.
+    """
+    try:
+        payload = {"ts": time.strftime("%Y-%m-%dT%H:%M:%S"), **record}
+        _get_logger().info("query", extra={"payload": payload})
+    except Exception as e:
+        print(f"[WARN] No se pudo registrar la consulta: {e}")
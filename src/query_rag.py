@@ -3,17 +3,22 @@ import json
 from pathlib import Path
 from sentence_transformers import SentenceTransformer
 
+import similarity
+
 # -------------------------
 # Config
 # -------------------------
-BASE_DIR = Path(__file__).resolve().parent.parent
-INDEX_DIR = BASE_DIR / "index"
+try:
+    from config import INDEX_DIR, RELEVANCE_THRESHOLD, EMBEDDING_MODEL_NAME
+except ImportError:
+    BASE_DIR = Path(__file__).resolve().parent.parent
+    INDEX_DIR = BASE_DIR / "index"
+    RELEVANCE_THRESHOLD = None
+    EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
 
 FAISS_PATH = INDEX_DIR / "faiss_index.bin"
 META_PATH = INDEX_DIR / "metadatos.json"
 
-EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
-
 
 def load_index_and_metadata():
     print("[INFO] Cargando índice FAISS y metadatos...")
@@ -26,26 +31,20 @@ def load_index_and_metadata():
     return index, metadata
 
 
-def embed_query(model, query: str):
-    return model.encode([query])
-
-
 def search(index, metadata, model, query: str, top_k: int = 5):
-    # 1) Embedding de la pregunta
-    q_vec = embed_query(model, query)
-
-    # 2) Búsqueda en FAISS
-    distances, indices = index.search(q_vec, top_k)
+    # 1) Embedding de la pregunta + búsqueda en FAISS (similitud coseno)
+    scores, indices = similarity.search(index, model, query, top_k)
 
     results = []
-    for rank, idx in enumerate(indices[0]):
+    for rank, idx in enumerate(indices):
         if idx < 0 or idx >= len(metadata):
             continue
         doc = metadata[idx]
         results.append(
             {
                 "rank": rank + 1,
-                "score": float(distances[0][rank]),
+                "score": float(scores[rank]),
+                "relevant": RELEVANCE_THRESHOLD is None or float(scores[rank]) >= RELEVANCE_THRESHOLD,
                 "id": doc.get("id"),
                 "fuente": doc.get("fuente"),
                 "texto": doc.get("texto", "")[:500] + "..."  # recortamos un poco
@@ -78,7 +77,8 @@ def main():
             print("No se encontraron chunks relevantes.")
         else:
             for r in results:
-                print(f"\n--- Resultado {r['rank']} (score={r['score']:.4f}) ---")
+                marca = "" if r["relevant"] else f" < umbral {RELEVANCE_THRESHOLD}"
+                print(f"\n--- Resultado {r['rank']} (similitud={r['score']:.4f}{marca}) ---")
                 print(f"ID: {r['id']} | Fuente: {r['fuente']}")
                 print(r["texto"])
         print("\n" + "=" * 60 + "\n")
@@ -1,35 +1,61 @@
+import hashlib
 import json
 from pathlib import Path
 from typing import List, Dict, Any
 import os
+import threading
+import time
 
 import faiss
-import numpy as np
-import requests
 from sentence_transformers import SentenceTransformer
 
+from llm_backends import get_backend
+from precompute_answers import AnswerStore
+from query_log import log_query
+from extractive import get_reader, is_factoid
+from small_to_big import merge_overlapping
+import similarity
+
 # ==========================
 # RUTAS Y CONFIGURACIÓN
 # ==========================
 
 try:
-    from config import INDEX_DIR
+    from config import (
+        INDEX_DIR, RELEVANCE_THRESHOLD, EMBEDDING_MODEL_NAME, SMALL_TO_BIG_FANOUT,
+        EXTRACTIVE_MIN_CONFIDENCE, EXTRACTIVE_PRELOAD, LLAMA_MODEL,
+    )
 except ImportError:
     BASE_DIR = Path(__file__).resolve().parent.parent
     INDEX_DIR = BASE_DIR / "index"
+    RELEVANCE_THRESHOLD = None
+    EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+    SMALL_TO_BIG_FANOUT = 4
+    EXTRACTIVE_MIN_CONFIDENCE = 0.3
+    EXTRACTIVE_PRELOAD = False
+    LLAMA_MODEL = "llama3.1:8b"
 
 INDEX_PATH = INDEX_DIR / "faiss_index.bin"
 META_PATH = INDEX_DIR / "metadatos.json"
-
-EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
-OLLAMA_URL = "http://localhost:11434/api/chat"
-LLAMA_MODEL = "llama3.1:8b"
+PARENTS_PATH = INDEX_DIR / "parents.json"
 
 
 # ==========================
 # CARGA DE ÍNDICE Y MODELO
 # ==========================
 
+# Tiempo (s) de cada fase de arranque, para bench_startup.py
+STARTUP_TIMINGS: Dict[str, float] = {}
+_t_phase = time.perf_counter()
+
+
+def _mark(phase: str) -> None:
+    global _t_phase
+    now = time.perf_counter()
+    STARTUP_TIMINGS[phase] = now - _t_phase
+    _t_phase = now
+
+
 print("[INFO] Cargando índice FAISS y metadatos...")
 if not INDEX_PATH.exists():
     raise FileNotFoundError(f"No se encuentra el índice: {INDEX_PATH}")
@@ -37,32 +63,111 @@ if not META_PATH.exists():
     raise FileNotFoundError(f"No se encuentran los metadatos: {META_PATH}")
 
 index = faiss.read_index(str(INDEX_PATH))
+_mark("load_index")
 
 with open(META_PATH, "r", encoding="utf-8") as f:
     METADATOS: List[Dict[str, Any]] = json.load(f)
 
+# Índice small-to-big: metadatos son ventanas pequeñas y cada una apunta a su chunk padre
+PARENTS: List[Dict[str, Any]] | None = None
+if PARENTS_PATH.exists():
+    with open(PARENTS_PATH, "r", encoding="utf-8") as f:
+        PARENTS = json.load(f)
+    print(f"[INFO] Modo small-to-big: {len(PARENTS)} chunks padre")
+_mark("load_metadata")
+
 print(f"[INFO] Chunks en índice: {index.ntotal}")
+if not similarity.is_cosine_index(index):
+    print("[WARN] Índice L2 antiguo: las similitudes son aproximadas. Ejecuta build_index.py para reconstruirlo.")
 print("[INFO] Cargando modelo de embeddings...")
 os.environ["HF_HUB_OFFLINE"] = "1"
 # embedder = SentenceTransformer(EMBEDDING_MODEL_NAME, local_files_only=True) # para local
 embedder = SentenceTransformer(EMBEDDING_MODEL_NAME)
+_mark("load_embedder")
+
+# Backend de generación (Ollama con pool de conexiones, o stub local).
+# La precarga del modelo no se hace al importar: ver warmup().
+llm = get_backend()
+
+
+def _start_thread(target, name: str) -> threading.Thread:
+    thread = threading.Thread(target=target, name=name, daemon=True)
+    thread.start()
+    return thread
+
+
+def preload_extractive_reader() -> threading.Thread:
+    """Carga en segundo plano el modelo del modo extractivo."""
+    return _start_thread(get_reader().preload, "reader-warmup")
+
+
+def warmup(preload_reader: bool = EXTRACTIVE_PRELOAD) -> List[threading.Thread]:
+    """
+    Precarga el modelo del LLM (y, si se pide, el lector extractivo) en segundo
+    plano para que la primera pregunta no pague la carga en frío. La llaman los
+    puntos de entrada (CLI, Streamlit) al arrancar; importar este módulo no
+    bloquea esperando a Ollama.
+    """
+    threads = [_start_thread(llm.warmup, "llm-warmup")]
+    if preload_reader:
+        threads.append(preload_extractive_reader())
+    return threads
 
 
 # ==========================
 # RETRIEVAL
 # ==========================
 
-def retrieve_context(question: str, k: int = 5) -> List[Dict[str, Any]]:
+def doc_from_pos(pos: int) -> Dict[str, Any]:
+    """
+    Documento de contexto para la posición `pos` del índice.
+    En modo small-to-big se devuelve el chunk padre de la ventana.
+    """
+    meta = METADATOS[pos]
+    doc = dict(PARENTS[meta["parent_pos"]]) if PARENTS is not None else dict(meta)
+    doc["index_pos"] = int(pos)
+    return doc
+
+
+def retrieve_context(question: str, k: int = 5,
+                     min_score: float | None = RELEVANCE_THRESHOLD) -> List[Dict[str, Any]]:
     """
-    Dada una pregunta, devuelve los k chunks más parecidos.
+    Dada una pregunta, devuelve los k chunks más parecidos con su similitud
+    coseno en "score". Descarta los que no llegan a `min_score`.
+
+    En modo small-to-big busca ventanas pequeñas, agrupa los aciertos por
+    chunk padre (score = el de su mejor ventana, "hits" = ventanas acertadas)
+    y devuelve los k mejores padres, uniendo los vecinos que se solapan.
     """
-    q_vec = embedder.encode([question]).astype("float32")
-    distances, indices = index.search(q_vec, k)
+    fetch = k * SMALL_TO_BIG_FANOUT if PARENTS is not None else k
+    scores, indices = similarity.search(index, embedder, question, fetch)
 
     results = []
-    for idx in indices[0]:
-        if 0 <= idx < len(METADATOS):
-            results.append(METADATOS[idx])
+    seen_parents: Dict[int, Dict[str, Any]] = {}
+    for score, idx in zip(scores, indices):
+        if not (0 <= idx < len(METADATOS)):
+            continue
+        if min_score is not None and score < min_score:
+            continue
+
+        if PARENTS is not None:
+            parent_pos = METADATOS[idx]["parent_pos"]
+            if parent_pos in seen_parents:
+                seen_parents[parent_pos]["hits"] += 1
+                continue
+            if len(seen_parents) == k:
+                continue
+            doc = doc_from_pos(idx)
+            doc["hits"] = 1
+            seen_parents[parent_pos] = doc
+        else:
+            doc = doc_from_pos(idx)
+
+        doc["score"] = round(float(score), 4)
+        results.append(doc)
+
+    if PARENTS is not None:
+        results = merge_overlapping(results)
     return results
 
 
@@ -70,33 +175,26 @@ def retrieve_context(question: str, k: int = 5) -> List[Dict[str, Any]]:
 # LLAMADA A LLAMA (OLLAMA)
 # ==========================
 
-def call_llama(prompt: str, system_prompt: str | None = None) -> str:
+LLM_OPTIONS = {"temperature": 0.2}
+
+
+def generate_llama(prompt: str, system_prompt: str | None = None) -> Dict[str, Any]:
     """
-    Llama al modelo llama3.1:8b a través de Ollama.
+    Llama al modelo llama3.1:8b a través del backend configurado (Ollama o stub).
+    Devuelve {"text", "prompt_tokens", "completion_tokens"}; los tokens son los
+    que informa Ollama (None con el stub).
     """
     messages = []
     if system_prompt:
         messages.append({"role": "system", "content": system_prompt})
     messages.append({"role": "user", "content": prompt})
 
-    payload = {
-        "model": LLAMA_MODEL,
-        "messages": messages,
-        "stream": False,
-        "options": {
-            "temperature": 0.2,
-        },
-    }
+    return llm.generate(messages, options=LLM_OPTIONS)
 
-    resp = requests.post(OLLAMA_URL, json=payload, timeout=120)
-    resp.raise_for_status()
-    data = resp.json()
 
-    # Formato típico de Ollama
-    if isinstance(data, dict) and "message" in data:
-        return data["message"]["content"]
-
-    return str(data)
+def call_llama(prompt: str, system_prompt: str | None = None) -> str:
+    """Como generate_llama, pero solo el texto."""
+    return generate_llama(prompt, system_prompt)["text"]
 
 
 # ==========================
@@ -143,28 +241,226 @@ Responde en español, de forma clara y breve (máximo 2 párrafos de 2 o 3 frase
 # FUNCIÓN PRINCIPAL RAG
 # ==========================
 
-def answer_with_rag(question: str, k: int = 5) -> Dict[str, Any]:
+NO_INFO_ANSWER = "No aparece información sobre esto en los documentos disponibles."
+
+SYSTEM_PROMPT = (
+    "Eres un asistente experto en Segunda Guerra Mundial y sabes mucho sobre geografía mundial. "
+    "Tu prioridad es responder de forma directa y concisa a la pregunta concreta del usuario. "
+    "No te extiendas con contexto histórico general si no es necesario. "
+    "Respondes SIEMPRE en español, usando solo la información del contexto que te doy. "
+    "Si el contexto no tiene la respuesta, dilo claramente sin inventar."
+)
+
+
+def generation_settings_hash() -> str:
     """
-    Recupera contexto + genera respuesta con Llama.
+    Huella de todo lo que, además del índice, cambia una respuesta generada:
+    modelo, opciones, prompts y parámetros de recuperación.
+    Las respuestas precalculadas solo se sirven si coincide.
     """
-    context_docs = retrieve_context(question, k=k)
-    prompt = build_rag_prompt(question, context_docs)
+    sample_doc = {"fuente": "<fuente>", "texto": "<texto>", "metadata": {"title": "<titulo>"}}
+    settings = {
+        "model": LLAMA_MODEL,
+        "options": LLM_OPTIONS,
+        "system_prompt": SYSTEM_PROMPT,
+        "prompt_template": build_rag_prompt("<pregunta>", [sample_doc]),
+        "relevance_threshold": RELEVANCE_THRESHOLD,
+        "small_to_big_fanout": SMALL_TO_BIG_FANOUT if PARENTS is not None else None,
+    }
+    raw = json.dumps(settings, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
 
-    system_prompt = (
-        "Eres un asistente experto en Segunda Guerra Mundial y sabes mucho sobre geografía mundial. "
-        "Tu prioridad es responder de forma directa y concisa a la pregunta concreta del usuario. "
-        "No te extiendas con contexto histórico general si no es necesario. "
-        "Respondes SIEMPRE en español, usando solo la información del contexto que te doy. "
-        "Si el contexto no tiene la respuesta, dilo claramente sin inventar."
-    )
 
-    answer = call_llama(prompt, system_prompt=system_prompt)
+# Respuestas precalculadas para preguntas frecuentes
+# (si existen para este índice y esta configuración de generación)
+answer_store = AnswerStore.load(settings_hash=generation_settings_hash())
+if answer_store is not None:
+    print(f"[INFO] Respuestas precalculadas cargadas: {len(answer_store)}")
+_mark("load_answer_store")
+
 
+def estimate_tokens(text: str) -> int:
+    """
+    Estimación rápida de tokens (~4 caracteres por token). Solo para backends
+    que no informan de los tokens reales (stub): con prompts en español y
+    contexto en inglés se desvía bastante.
+    """
+    return (len(text) + 3) // 4
+
+
+def _scheduler_snapshot() -> Dict[str, Any] | None:
+    """Estado del planificador de Ollama (cola, en curso, rechazos) tras la petición."""
+    if not hasattr(llm, "metrics"):
+        return None
+    m = llm.metrics()
     return {
+        "queue_depth": m["queue_depth"],
+        "inflight": m["inflight"],
+        "rejected": m["rejected"],
+        "down": [ep["endpoint"] for ep in m["endpoints"] if not ep["healthy"]],
+    }
+
+
+def _log_answer(source: str, question: str, k: int, result: Dict[str, Any] | None,
+                timings: Dict[str, float], prompt_tokens: int | None, completion_tokens: int | None = None,
+                tokens_estimated: bool = False, error: Exception | None = None) -> None:
+    context_docs = result["context_docs"] if result else []
+    log_query({
+        "source": source,
+        "question": question,
+        "k": k,
+        "precomputed": bool(result and result.get("precomputed")),
+        "answer_mode": result.get("answer_mode") if result else None,
+        "confidence": result.get("confidence") if result else None,
+        "n_results": len(context_docs),
+        "chunks": [
+            {"id": d.get("id"), "pos": d.get("index_pos"), "score": d.get("score")}
+            for d in context_docs
+        ],
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "tokens_estimated": tokens_estimated,
+        "timings_ms": {name: round(t * 1000, 1) for name, t in timings.items()},
+        "error": f"{type(error).__name__}: {error}" if error else None,
+        "extractive_error": result.get("extractive_error") if result else None,
+        "llm": _scheduler_snapshot(),
+    })
+
+
+ANSWER_MODES = ("generative", "extractive", "auto")
+
+
+def format_extractive_answer(span: str, doc: Dict[str, Any], confidence: float) -> str:
+    meta = doc.get("metadata", {}) or {}
+    title = meta.get("title") or meta.get("filename") or doc.get("fuente", "")
+    return f"{span}\n\n_(Fragmento literal de «{title}», confianza {confidence:.0%})_"
+
+
+def answer_with_rag(question: str, k: int = 5, use_precomputed: bool = True,
+                    source: str = "rag_chat", mode: str = "generative") -> Dict[str, Any]:
+    """
+    Recupera contexto + genera respuesta con Llama.
+    Si la pregunta (normalizada) está precalculada, responde directamente.
+    Cada llamada queda registrada en el log de consultas (`source` indica el origen).
+
+    `mode`:
+    - "generative": siempre Llama.
+    - "extractive": primero el lector extractivo sobre los chunks recuperados;
+      si la confianza no llega a EXTRACTIVE_MIN_CONFIDENCE, Llama.
+    - "auto": extractivo solo para preguntas de dato concreto (fecha, cifra, nombre).
+    """
+    if mode not in ANSWER_MODES:
+        raise ValueError(f"Modo desconocido: {mode}. Opciones: {', '.join(ANSWER_MODES)}")
+
+    t_start = time.perf_counter()
+    timings: Dict[str, float] = {}
+
+    if use_precomputed and answer_store is not None:
+        hit = answer_store.lookup(question, k)
+        if hit is not None:
+            context_docs = [doc_from_pos(pos) for pos in hit["sources"]]
+            result = {
+                "question": question,
+                "answer": hit["answer"],
+                "context_docs": context_docs,
+                "precomputed": True,
+                "no_info": False,
+                "answer_mode": "precomputed",
+            }
+            timings["total"] = time.perf_counter() - t_start
+            result["timings"] = timings
+            _log_answer(source, question, k, result, timings, prompt_tokens=0)
+            return result
+
+    t0 = time.perf_counter()
+    context_docs = retrieve_context(question, k=k)
+    timings["retrieve"] = time.perf_counter() - t0
+
+    # Ningún chunk es relevante: respondemos sin pasar por el LLM
+    if not context_docs:
+        timings["total"] = time.perf_counter() - t_start
+        result = {
+            "question": question,
+            "answer": NO_INFO_ANSWER,
+            "context_docs": [],
+            "precomputed": False,
+            "no_info": True,
+            "answer_mode": "no_info",
+            "timings": timings,
+        }
+        _log_answer(source, question, k, result, timings, prompt_tokens=0)
+        return result
+
+    # Modo extractivo: respuesta literal sin LLM si el lector está seguro
+    confidence = None
+    extractive_error = None
+    if mode == "extractive" or (mode == "auto" and is_factoid(question)):
+        t0 = time.perf_counter()
+        try:
+            best = get_reader().extract(question, context_docs)
+        except Exception as e:
+            # Sin lector (no se pudo cargar el modelo, etc.): se responde con el LLM
+            best = None
+            extractive_error = f"{type(e).__name__}: {e}"
+        timings["extract"] = time.perf_counter() - t0
+        confidence = best["confidence"] if best else 0.0
+        if best is not None and best["confidence"] >= EXTRACTIVE_MIN_CONFIDENCE:
+            timings["total"] = time.perf_counter() - t_start
+            # El chunk del que sale la respuesta va primero en las fuentes
+            source_doc = best["doc"]
+            others = [d for d in context_docs if d is not source_doc]
+            result = {
+                "question": question,
+                "answer": format_extractive_answer(best["answer"], source_doc, best["confidence"]),
+                "context_docs": [source_doc] + others,
+                "precomputed": False,
+                "no_info": False,
+                "answer_mode": "extractive",
+                "confidence": round(best["confidence"], 4),
+                "timings": timings,
+            }
+            _log_answer(source, question, k, result, timings, prompt_tokens=0)
+            return result
+
+    t0 = time.perf_counter()
+    prompt = build_rag_prompt(question, context_docs)
+    timings["prompt"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    try:
+        generation = generate_llama(prompt, system_prompt=SYSTEM_PROMPT)
+    except Exception as e:
+        timings["generate"] = time.perf_counter() - t0
+        timings["total"] = time.perf_counter() - t_start
+        _log_answer(source, question, k, {"context_docs": context_docs, "answer_mode": "generative",
+                                          "confidence": confidence, "extractive_error": extractive_error},
+                    timings, prompt_tokens=None, error=e)
+        raise
+    timings["generate"] = time.perf_counter() - t0
+    timings["total"] = time.perf_counter() - t_start
+
+    answer = generation["text"]
+    prompt_tokens = generation["prompt_tokens"]
+    completion_tokens = generation["completion_tokens"]
+    tokens_estimated = prompt_tokens is None
+    if tokens_estimated:
+        # El backend no informa de tokens (stub): estimación por caracteres
+        prompt_tokens = estimate_tokens(SYSTEM_PROMPT + prompt)
+        completion_tokens = estimate_tokens(answer)
+
+    result = {
         "question": question,
         "answer": answer,
         "context_docs": context_docs,
+        "precomputed": False,
+        "no_info": False,
+        "answer_mode": "generative",
+        "confidence": confidence,   # del lector extractivo si se intentó antes
+        "extractive_error": extractive_error,
+        "timings": timings,
     }
+    _log_answer(source, question, k, result, timings, prompt_tokens, completion_tokens, tokens_estimated)
+    return result
 
 
 # ==========================
@@ -172,6 +468,7 @@ def answer_with_rag(question: str, k: int = 5) -> Dict[str, Any]:
 # ==========================
 
 if __name__ == "__main__":
+    warmup()
     print(">>> Chat RAG con Llama 3.1:8B (Ollama). Escribe 'salir' para terminar.")
     while True:
         q = input("\nTú: ").strip()
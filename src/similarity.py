@@ -0,0 +1,35 @@
+import faiss
+import numpy as np
+
+# ==========================
+# SIMILITUD COSENO CON FAISS
+# ==========================
+# El índice guarda embeddings normalizados (norma 1) en un IndexFlatIP,
+# así el producto interno es directamente la similitud coseno.
+
+
+def normalize(vectors) -> np.ndarray:
+    """Devuelve una copia float32 con cada fila normalizada a norma 1."""
+    vectors = np.array(vectors, dtype="float32")
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def is_cosine_index(index) -> bool:
+    return index.metric_type == faiss.METRIC_INNER_PRODUCT
+
+
+def search(index, embedder, query: str, k: int):
+    """
+    Busca la pregunta en el índice y devuelve (similitudes, posiciones).
+    Con un índice L2 antiguo (sin normalizar) se mantiene la búsqueda original
+    y la similitud es aproximada: hay que reconstruir el índice.
+    """
+    q_vec = embedder.encode([query])
+    if is_cosine_index(index):
+        scores, indices = index.search(normalize(q_vec), k)
+        return np.clip(scores[0], -1.0, 1.0), indices[0]
+
+    distances, indices = index.search(np.array(q_vec, dtype="float32"), k)
+    # Para vectores unitarios: ||a - b||² = 2 - 2·cos(a, b)
+    return 1.0 - distances[0] / 2.0, indices[0]
@@ -0,0 +1,40 @@
+from typing import List, Dict, Any
+
+# ==========================
+# SMALL-TO-BIG: UNIÓN DE CHUNKS PADRE
+# ==========================
+
+
+def merge_overlapping(docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Une los chunks padre del mismo documento que se solapan (chunks vecinos),
+    para no repetir texto en el prompt. Mantiene el orden por score.
+    """
+    by_doc: Dict[Any, List[Dict[str, Any]]] = {}
+    for d in docs:
+        by_doc.setdefault(d.get("doc_id"), []).append(d)
+
+    merged = []
+    for doc_id, group in by_doc.items():
+        if doc_id is None or any("char_start" not in d for d in group):
+            merged.extend(group)
+            continue
+        group.sort(key=lambda d: d["char_start"])
+        current = group[0]
+        for nxt in group[1:]:
+            if nxt["char_start"] <= current["char_end"]:
+                best = current if current["score"] >= nxt["score"] else nxt
+                current = {
+                    **best,
+                    # El texto unido empieza en `current`, no en el chunk de mejor score
+                    "char_start": min(current["char_start"], nxt["char_start"]),
+                    "texto": current["texto"] + nxt["texto"][current["char_end"] - nxt["char_start"]:],
+                    "char_end": max(current["char_end"], nxt["char_end"]),
+                    "hits": current.get("hits", 1) + nxt.get("hits", 1),
+                }
+            else:
+                merged.append(current)
+                current = nxt
+        merged.append(current)
+
+    return sorted(merged, key=lambda d: d["score"], reverse=True)
@@ -11,7 +11,8 @@ sys.path.append(str(ROOT_DIR))
 SRC_DIR = ROOT_DIR / "src"
 sys.path.append(str(SRC_DIR))
 
-from rag_chat import answer_with_rag
+from rag_chat import answer_with_rag, llm, warmup, preload_extractive_reader
+from llm_scheduler import SchedulerBusyError
 
 
 # ==========================
@@ -23,6 +24,14 @@ st.set_page_config(
     page_icon="🪖",
 )
 
+# Precarga del LLM en segundo plano, una sola vez por proceso
+@st.cache_resource
+def precargar_modelos():
+    return warmup()
+
+
+precargar_modelos()
+
 # ==========================
 # ESTILO GLOBAL
 # ==========================
@@ -64,6 +73,57 @@ st.markdown("<h1 class='centered-title'>Chatbot WW2 - RAG</h1>", unsafe_allow_ht
 st.markdown("<p class='centered-subtitle'>Pregunta lo que quieras sobre la Segunda Guerra Mundial. Respuestas basadas SOLO en dataset indexado.</p>", unsafe_allow_html=True)
 
 
+# ==========================
+# MODO DE RESPUESTA
+# ==========================
+
+# Generativo por defecto: los otros modos responden con el fragmento literal
+# de los documentos (en inglés) y hay que elegirlos expresamente
+MODOS = {
+    "Generativo (Llama)": "generative",
+    "Automático": "auto",
+    "Extractivo (rápido)": "extractive",
+}
+modo_label = st.sidebar.radio(
+    "Modo de respuesta",
+    list(MODOS),
+    index=0,
+    help="Extractivo: devuelve el fragmento literal de los documentos (fechas, cifras, nombres), "
+         "en su idioma original, sin pasar por el LLM salvo que la confianza sea baja. "
+         "Automático: extractivo solo para preguntas de dato concreto.",
+)
+
+
+# El lector extractivo se carga al elegir un modo que lo usa, no en la primera pregunta
+@st.cache_resource
+def precargar_lector():
+    return preload_extractive_reader()
+
+
+if MODOS[modo_label] != "generative":
+    precargar_lector()
+
+
+# ==========================
+# ESTADO DEL BACKEND LLM
+# ==========================
+
+# Se rellena al final del script, cuando la petición actual ya ha terminado
+estado_llm = st.sidebar.empty()
+
+
+def mostrar_estado_llm():
+    if not hasattr(llm, "metrics"):
+        return
+    with estado_llm.container():
+        with st.expander("Estado de Ollama"):
+            m = llm.metrics()
+            st.write(f"En cola: {m['queue_depth']}/{m['max_queue']} · En curso: {m['inflight']} · Rechazadas: {m['rejected']}")
+            for ep in m["endpoints"]:
+                estado = "🟢" if ep["healthy"] else "🔴"
+                st.write(f"{estado} {ep['endpoint']} — en curso: {ep['outstanding']}, completadas: {ep['completed']}, fallos: {ep['failures']}")
+
+
 # ==========================
 # HISTORIAL DE CONVERSACIÓN
 # ==========================
@@ -91,14 +151,21 @@ if question:
 
     with st.chat_message("assistant"):
         with st.spinner("Buscando información real y contrastada..."):
-            result = answer_with_rag(question)
+            try:
+                result = answer_with_rag(question, source="streamlit", mode=MODOS[modo_label])
+            except SchedulerBusyError as e:
+                st.warning(str(e))
+                mostrar_estado_llm()
+                st.stop()
             answer = result["answer"]
 
             st.markdown(answer)
 
             # Detectar si no hay información y extraer documentos
             context_docs = result.get("context_docs", [])
-            no_info = answer.startswith((
+            # no_info: ningún chunk supera el umbral de relevancia (no se llamó al LLM),
+            # o el propio LLM indica que el contexto no contiene la respuesta
+            no_info = result.get("no_info") or answer.startswith((
                 "No hay información",
                 "No aparece información",
                 "No se ha encontrado información",
@@ -169,3 +236,6 @@ if question:
                 st.markdown(f"<div class='quote-box'>“{snippet}”</div>", unsafe_allow_html=True)
 
                 st.markdown("<hr>", unsafe_allow_html=True)
+
+
+mostrar_estado_llm()
@@ -0,0 +1,41 @@
+import pytest
+
+from extractive import ExtractiveReader, ExtractiveUnavailableError, is_factoid
+
+DOCS = [{"texto": "Germany invaded Poland on 1 September 1939."}]
+
+
+def test_failed_load_is_not_retried(monkeypatch):
+    reader = ExtractiveReader("modelo-inexistente")
+    loads = []
+
+    def failing_load():
+        loads.append(1)
+        raise OSError("sin conexión y sin caché")
+
+    monkeypatch.setattr(reader, "_load", failing_load)
+
+    reader.preload()   # no debe lanzar: solo avisa
+    for _ in range(3):
+        with pytest.raises(ExtractiveUnavailableError, match="sin conexión"):
+            reader.extract("¿Cuándo empezó la invasión de Polonia?", DOCS)
+    assert loads == [1]
+
+
+def test_extract_picks_best_span(monkeypatch):
+    reader = ExtractiveReader("modelo-falso")
+
+    def fake_qa(question, context, **kwargs):
+        return [{"answer": "1 September 1939", "score": 0.8, "start": 27, "end": 43}]
+
+    monkeypatch.setattr(reader, "_load", lambda: fake_qa)
+
+    best = reader.extract("¿Cuándo empezó la invasión de Polonia?", DOCS)
+    assert best["answer"] == "1 September 1939"
+    assert best["confidence"] == 0.8
+    assert best["doc"] is DOCS[0]
+
+
+def test_is_factoid():
+    assert is_factoid("¿Cuántos soldados murieron en Stalingrado?")
+    assert not is_factoid("Explica las causas de la guerra")
@@ -0,0 +1,113 @@
+import socket
+import threading
+
+import pytest
+
+from llm_backends import LLMBackend, LLMUnavailableError, OllamaBackend, StubBackend, serve_stub
+from llm_scheduler import GenerationScheduler, SchedulerBusyError
+
+
+class DeadBackend(LLMBackend):
+    """Rechaza todas las conexiones, como una instancia de Ollama caída."""
+
+    name = "dead"
+
+    def __init__(self):
+        self.calls = 0
+
+    def chat(self, messages, options=None):
+        self.calls += 1
+        raise LLMUnavailableError("connection refused")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+MESSAGES = [{"role": "user", "content": "hola"}]
+
+
+def test_fails_over_to_healthy_endpoint():
+    dead, live = DeadBackend(), StubBackend()
+    scheduler = GenerationScheduler([dead, live])
+
+    for _ in range(5):
+        assert scheduler.chat(MESSAGES).startswith("Respuesta simulada")
+
+    # Tras el primer fallo la instancia caída queda detrás de la sana
+    assert dead.calls == 1
+    assert live.calls == 5
+
+
+def test_single_dead_endpoint_raises_busy():
+    scheduler = GenerationScheduler([DeadBackend()])
+
+    with pytest.raises(SchedulerBusyError):
+        scheduler.chat(MESSAGES)
+
+
+def test_other_errors_are_not_retried():
+    class Broken(LLMBackend):
+        def chat(self, messages, options=None):
+            raise RuntimeError("Error de Ollama: model not found")
+
+    live = StubBackend()
+    scheduler = GenerationScheduler([Broken(), live])
+    scheduler.endpoints[1].outstanding = 1   # que se elija primero la que falla
+
+    with pytest.raises(RuntimeError, match="model not found"):
+        scheduler.chat(MESSAGES)
+    assert live.calls == 0
+
+
+def test_concurrent_requests_with_one_dead_ollama():
+    server = serve_stub(port=free_port(), latency=0.05)
+    try:
+        live_url = f"http://127.0.0.1:{server.server_address[1]}/api/chat"
+        dead_url = f"http://127.0.0.1:{free_port()}/api/chat"
+        backends = [OllamaBackend(url=dead_url, max_retries=0), OllamaBackend(url=live_url, max_retries=0)]
+        scheduler = GenerationScheduler(backends, max_inflight_per_endpoint=8, queue_timeout=10)
+
+        results, errors = [], []
+
+        def ask():
+            try:
+                results.append(scheduler.chat(MESSAGES))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=ask) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert errors == []
+        assert len(results) == 8
+        scheduler.close()
+    finally:
+        server.shutdown()
+
+
+def test_token_counts_are_forwarded_from_ollama():
+    server = serve_stub(port=free_port())
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/api/chat"
+        scheduler = GenerationScheduler([OllamaBackend(url=url)])
+
+        result = scheduler.generate([{"role": "user", "content": "una pregunta de cinco palabras"}])
+
+        assert result["text"].startswith("Respuesta simulada")
+        assert result["prompt_tokens"] == 5
+        assert result["completion_tokens"] == len(result["text"].split(" "))
+        scheduler.close()
+    finally:
+        server.shutdown()
+
+
+def test_backends_without_counts_return_none():
+    result = StubBackend().generate(MESSAGES)
+
+    assert result["prompt_tokens"] is None and result["completion_tokens"] is None
@@ -0,0 +1,56 @@
+import pipeline
+from pipeline import Stage
+
+
+def make_stage(tmp_path, name="etapa"):
+    return Stage(name=name, script=f"{name}.py", outputs=[tmp_path / f"{name}.out"])
+
+
+def test_missing_outputs_are_never_up_to_date(tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline, "BASE_DIR", tmp_path)
+    stage = make_stage(tmp_path)
+    state = {"etapa": {"fingerprint": "abc", "outputs": None}}
+
+    assert not pipeline.is_up_to_date(stage, "abc", state)
+
+
+def test_stage_without_outputs_fails_and_is_rerun(tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline, "BASE_DIR", tmp_path)
+    monkeypatch.setattr(pipeline, "STATE_PATH", tmp_path / "state.json")
+    stage = make_stage(tmp_path)
+    monkeypatch.setattr(pipeline, "STAGES", [stage])
+    monkeypatch.setattr(pipeline, "stage_fingerprint", lambda s: "abc")
+
+    runs = []
+
+    def run_stage(s):
+        # Sale con código 0 sin escribir la salida
+        runs.append(s.name)
+        return True, 0.0, tmp_path / "etapa.log"
+
+    monkeypatch.setattr(pipeline, "run_stage", run_stage)
+
+    first = pipeline.run_pipeline([], [], dry_run=False, workers=1)
+    second = pipeline.run_pipeline([], [], dry_run=False, workers=1)
+
+    assert first["etapa"]["status"] == "fallida"
+    assert second["etapa"]["status"] == "fallida"
+    assert runs == ["etapa", "etapa"]
+    assert "etapa" not in pipeline.load_state()
+
+
+def test_stage_with_outputs_is_skipped_next_time(tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline, "BASE_DIR", tmp_path)
+    monkeypatch.setattr(pipeline, "STATE_PATH", tmp_path / "state.json")
+    stage = make_stage(tmp_path)
+    monkeypatch.setattr(pipeline, "STAGES", [stage])
+    monkeypatch.setattr(pipeline, "stage_fingerprint", lambda s: "abc")
+
+    def run_stage(s):
+        s.outputs[0].write_text("ok", encoding="utf-8")
+        return True, 0.0, tmp_path / "etapa.log"
+
+    monkeypatch.setattr(pipeline, "run_stage", run_stage)
+
+    assert pipeline.run_pipeline([], [], dry_run=False, workers=1)["etapa"]["status"] == "ejecutada"
+    assert pipeline.run_pipeline([], [], dry_run=False, workers=1)["etapa"]["status"] == "al día"
@@ -0,0 +1,38 @@
+from small_to_big import merge_overlapping
+
+TEXT = "".join(chr(ord("a") + i % 26) for i in range(2000))
+
+
+def chunk(start, end, score, doc_id="d1"):
+    return {"doc_id": doc_id, "char_start": start, "char_end": end, "texto": TEXT[start:end], "score": score}
+
+
+def test_merge_keeps_offsets_when_later_neighbour_scores_higher():
+    merged = merge_overlapping([chunk(0, 800, 0.3), chunk(600, 1400, 0.9)])
+
+    assert len(merged) == 1
+    doc = merged[0]
+    assert (doc["char_start"], doc["char_end"]) == (0, 1400)
+    assert doc["texto"] == TEXT[0:1400]
+    assert doc["score"] == 0.9
+    assert doc["hits"] == 2
+
+
+def test_merge_leaves_disjoint_chunks_and_other_documents_apart():
+    merged = merge_overlapping([
+        chunk(0, 800, 0.5),
+        chunk(1000, 1800, 0.7),
+        chunk(600, 1400, 0.6, doc_id="d2"),
+    ])
+
+    assert [(d["doc_id"], d["char_start"], d["char_end"]) for d in merged] == [
+        ("d1", 1000, 1800), ("d2", 600, 1400), ("d1", 0, 800),
+    ]
+
+
+def test_merge_contained_chunk():
+    merged = merge_overlapping([chunk(0, 800, 0.4), chunk(200, 600, 0.8)])
+
+    assert len(merged) == 1
+    assert (merged[0]["char_start"], merged[0]["char_end"]) == (0, 800)
+    assert merged[0]["texto"] == TEXT[0:800]